@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Инкрементальные резервные копии базы данных (backup/restore).
+
+Копия - это директория с манифестом и хранилищем objects/. Манифест для
+каждого файла базы (метаданных и data/) хранит его версию (inode, время
+изменения, размер) и контрольную сумму sha256, а содержимое файла лежит в
+objects/<sha256>. Повторный backup в ту же директорию копирует только файлы,
+версия которых изменилась, и не трогает файлы предыдущей копии: новая копия
+фиксируется атомарной заменой манифеста, и только после этого удаляются
+объекты, на которые он больше не ссылается. Если backup не завершился,
+директория по-прежнему содержит предыдущую копию. Файлы копируются потоково,
+без загрузки таблиц в память.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from .blocks import atomic_write, remove_file
+from .constants import (
+    BACKUP_CHUNK_SIZE,
+    BACKUP_FORMAT,
+    BACKUP_MANIFEST,
+    BACKUP_MAX_ATTEMPTS,
+    BACKUP_OBJECTS_DIR,
+    DATA_DIR,
+    DB_META_PATH,
+    LOCK_SUFFIX,
+)
+from .decorators import confirm_action, handle_db_errors
+from .writeback import clear_pending, flush
+
+
+def list_database_files():
+    """Возвращает пути файла метаданных и всех файлов данных."""
+    files = [DB_META_PATH] if os.path.exists(DB_META_PATH) else []
+    for root, dirs, names in os.walk(DATA_DIR):
+        dirs.sort()
+        for name in sorted(names):
+            if not name.endswith((".tmp", LOCK_SUFFIX)):
+                files.append(os.path.join(root, name))
+    return files
+
+
+def get_file_version(path):
+    """Возвращает версию файла или None, если файла нет."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def copy_file(src, dst, fsync="none"):
+    """Потоково копирует файл с атомарной заменой. Возвращает sha256."""
+    digest = hashlib.sha256()
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+    with open(src, 'rb') as fin, atomic_write(dst, 'wb', fsync) as fout:
+        while chunk := fin.read(BACKUP_CHUNK_SIZE):
+            digest.update(chunk)
+            fout.write(chunk)
+    return digest.hexdigest()
+
+
+def file_checksum(path):
+    """Потоково считает sha256 файла."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(BACKUP_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(backup_dir):
+    """Загружает манифест копии. Для новой директории - пустой манифест."""
+    try:
+        with open(os.path.join(backup_dir, BACKUP_MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"files": {}}
+
+
+def _to_key(path):
+    return path.replace(os.sep, '/')
+
+
+def get_objects_dir(backup_dir):
+    return os.path.join(backup_dir, BACKUP_OBJECTS_DIR)
+
+
+def get_backup_source(backup_dir, manifest, key):
+    """Возвращает путь к содержимому файла key в копии.
+
+    Копии старого формата хранят файлы под их путями в базе.
+    """
+    if manifest.get("format") == BACKUP_FORMAT:
+        return os.path.join(
+            get_objects_dir(backup_dir), manifest["files"][key]["sha256"]
+        )
+    return os.path.join(backup_dir, *key.split('/'))
+
+
+def store_object(backup_dir, path):
+    """Копирует файл в objects/ под именем его sha256. Возвращает sha256.
+
+    Файл сначала пишется под временным именем, поэтому объекты предыдущей
+    копии не перезаписываются.
+    """
+    objects_dir = get_objects_dir(backup_dir)
+    staging_path = os.path.join(objects_dir, "incoming")
+    checksum = copy_file(path, staging_path, fsync="file")
+    os.replace(staging_path, os.path.join(objects_dir, checksum))
+    return checksum
+
+
+def fsync_dir(dir_path):
+    dir_fd = os.open(dir_path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def remove_unreferenced(backup_dir, old_manifest, files):
+    """Удаляет объекты и файлы старого формата, не нужные новой копии."""
+    referenced = {entry["sha256"] for entry in files.values()}
+    objects_dir = get_objects_dir(backup_dir)
+    for name in os.listdir(objects_dir):
+        if name not in referenced:
+            remove_file(os.path.join(objects_dir, name))
+
+    if old_manifest.get("format") == BACKUP_FORMAT:
+        return
+    for key in old_manifest["files"]:
+        remove_file(get_backup_source(backup_dir, old_manifest, key))
+    old_data_dir = os.path.join(backup_dir, DATA_DIR)
+    for root, _dirs, _names in os.walk(old_data_dir, topdown=False):
+        if not os.listdir(root):
+            os.rmdir(root)
+
+
+def _is_inside(path, dir_path):
+    return os.path.commonpath([path, dir_path]) == dir_path
+
+
+def is_valid_key(key):
+    """Проверяет, что ключ манифеста - файл метаданных или файл в data/.
+
+    Допускаются только нормализованные относительные пути, поэтому
+    манифест не может указать на файл вне базы.
+    """
+    if key == _to_key(DB_META_PATH):
+        return True
+    parts = key.split('/')
+    if os.path.isabs(key) or any(part in ('', '.', '..') for part in parts):
+        return False
+    path = os.path.join(*parts)
+    data_dir = os.path.abspath(DATA_DIR)
+    return (
+        os.path.normpath(path) == path
+        and os.path.abspath(path) != data_dir
+        and _is_inside(os.path.abspath(path), data_dir)
+    )
+
+
+def check_manifest(files):
+    """Выбрасывает ValueError, если в манифесте есть недопустимый путь."""
+    for key, entry in files.items():
+        if not is_valid_key(key):
+            raise ValueError(f'Недопустимый путь в манифесте копии: "{key}"')
+        if not SHA256_PATTERN.match(str(entry.get("sha256"))):
+            raise ValueError(f'Недопустимая контрольная сумма файла "{key}"')
+
+
+def check_backup_dir(backup_dir):
+    """Возвращает ошибку, если директория копии пересекается с базой."""
+    backup_path = os.path.realpath(backup_dir)
+    db_root = os.path.dirname(os.path.realpath(DB_META_PATH))
+    if _is_inside(db_root, backup_path):
+        return "Ошибка: Директория копии не может содержать файлы базы."
+    if _is_inside(backup_path, os.path.realpath(DATA_DIR)):
+        return "Ошибка: Директория копии не может быть внутри data/."
+    return None
+
+
+@handle_db_errors
+def backup_database(backup_dir):
+    """Создает или обновляет резервную копию в директории backup_dir."""
+    error = check_backup_dir(backup_dir)
+    if error:
+        return False, error
+
+    # Старый манифест нужен, чтобы не копировать неизмененные файлы и после
+    # фиксации новой копии удалить ненужные объекты
+    old_manifest = load_manifest(backup_dir)
+    check_manifest(old_manifest["files"])
+    previous = {}
+    if old_manifest.get("format") == BACKUP_FORMAT:
+        previous = old_manifest["files"]
+    objects_dir = get_objects_dir(backup_dir)
+    os.makedirs(objects_dir, exist_ok=True)
+
+    # Отложенные изменения должны попасть в копию
+    flush()
+    copied_files = 0
+    copied_bytes = 0
+
+    for _attempt in range(BACKUP_MAX_ATTEMPTS):
+        files = {}
+        for path in list_database_files():
+            key = _to_key(path)
+            version = get_file_version(path)
+            if version is None:
+                continue
+
+            entry = previous.get(key)
+            if (entry and entry["version"] == version and os.path.exists(
+                    os.path.join(objects_dir, entry["sha256"]))):
+                files[key] = entry
+                continue
+
+            checksum = store_object(backup_dir, path)
+            files[key] = {"version": version, "sha256": checksum}
+            copied_files += 1
+            copied_bytes += version[2]
+
+        # Копия согласована, если за время копирования ни один файл не менялся
+        current_keys = {_to_key(path) for path in list_database_files()}
+        is_consistent = current_keys == set(files) and all(
+            get_file_version(key) == entry["version"]
+            for key, entry in files.items()
+        )
+        if is_consistent:
+            break
+        previous = files
+    else:
+        return False, (
+            "Ошибка: Данные менялись во время копирования, "
+            "согласованную копию получить не удалось. "
+            "Предыдущая копия не изменена."
+        )
+
+    # Замена манифеста - точка фиксации: объекты уже записаны на диск
+    fsync_dir(objects_dir)
+    manifest = {
+        "format": BACKUP_FORMAT,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "files": files,
+    }
+    with atomic_write(
+        os.path.join(backup_dir, BACKUP_MANIFEST), fsync="full"
+    ) as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    remove_unreferenced(backup_dir, old_manifest, files)
+
+    return True, (
+        f'Резервная копия в "{backup_dir}" обновлена: скопировано файлов '
+        f'{copied_files} ({copied_bytes} байт), без изменений '
+        f'{len(files) - copied_files} из {len(files)}.'
+    )
+
+
+@handle_db_errors
+@confirm_action("восстановление из резервной копии")
+def restore_database(backup_dir):
+    """Восстанавливает метаданные и таблицы из резервной копии."""
+    error = check_backup_dir(backup_dir)
+    if error:
+        return False, error
+    if not os.path.exists(os.path.join(backup_dir, BACKUP_MANIFEST)):
+        return False, f'Ошибка: В "{backup_dir}" нет резервной копии.'
+
+    # Пути проверяются до восстановления первого файла
+    manifest = load_manifest(backup_dir)
+    files = manifest["files"]
+    check_manifest(files)
+    sources = {
+        key: get_backup_source(backup_dir, manifest, key) for key in files
+    }
+    for key, entry in files.items():
+        source = sources[key]
+        if (not os.path.exists(source)
+                or file_checksum(source) != entry["sha256"]):
+            return False, f'Ошибка: Файл копии "{key}" поврежден.'
+
+    # Изменения, не попавшие на диск, заменяются содержимым копии
+    clear_pending()
+    restored = 0
+    meta_key = _to_key(DB_META_PATH)
+    for key in sorted(files, key=lambda k: k == meta_key):
+        path = os.path.join(*key.split('/'))
+        if os.path.exists(path) and file_checksum(path) == files[key]["sha256"]:
+            continue
+        copy_file(sources[key], path)
+        restored += 1
+
+    for path in list_database_files():
+        if _to_key(path) not in files:
+            remove_file(path)
+    for root, _dirs, _names in os.walk(DATA_DIR, topdown=False):
+        if root != DATA_DIR and not os.listdir(root):
+            os.rmdir(root)
+
+    return True, (
+        f'База восстановлена из "{backup_dir}": обновлено файлов {restored}, '
+        f'без изменений {len(files) - restored}.'
+    )
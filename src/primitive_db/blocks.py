@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Сжатое блочное хранение записей таблиц (zlib, lzma, bz2).
+
+Сжатый файл лежит рядом с обычным .json под именем .jsonz и состоит из
+независимо сжатых блоков по block_size записей, за которыми следует
+JSON-индекс блоков и 8 байт его длины. Индекс хранит диапазон ID каждого
+блока, поэтому поиск по ID распаковывает только нужный блок. Если индекс
+хранит столбцы с кодами типов, записи блока лежат компактно: строками
+значений без имен полей (см. schema.encode_rows).
+"""
+import importlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from .constants import DEFAULT_BLOCK_SIZE
+from .schema import decode_rows, encode_rows
+
+MAGIC = b"PDBZ1\n"
+TRAILER_SIZE = 8
+COMPRESSED_SUFFIX = "z"
+
+
+def get_compressed_path(filepath):
+    """Возвращает путь к сжатому варианту файла данных."""
+    return filepath + COMPRESSED_SUFFIX
+
+
+@contextmanager
+def atomic_write(filepath, mode='w', fsync="none"):
+    """Открывает временный файл и атомарно заменяет им filepath.
+
+    Читатели, уже открывшие старый файл, дочитывают прежнюю версию целиком.
+    fsync: "none" - без fsync, "file" - fsync файла перед заменой,
+    "full" - дополнительно fsync директории после замены.
+    """
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    encoding = None if 'b' in mode else 'utf-8'
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+            if fsync != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+        if fsync == "full":
+            dir_fd = os.open(os.path.dirname(filepath) or '.', os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    finally:
+        remove_file(tmp_path)
+
+
+def get_codec(codec_name):
+    """Импортирует модуль кодека при первом использовании."""
+    return importlib.import_module(codec_name)
+
+
+def read_index(filepath):
+    """Читает индекс блоков сжатого файла."""
+    with open(get_compressed_path(filepath), 'rb') as f:
+        return _read_index(f)
+
+
+def _read_index(f):
+    f.seek(-TRAILER_SIZE, os.SEEK_END)
+    index_size = int.from_bytes(f.read(TRAILER_SIZE), "big")
+    f.seek(-(TRAILER_SIZE + index_size), os.SEEK_END)
+    return json.loads(f.read(index_size).decode('utf-8'))
+
+
+def get_file_codec(filepath):
+    """Возвращает кодек файла данных или None, если файл не сжат."""
+    if not os.path.exists(get_compressed_path(filepath)):
+        return None
+    return read_index(filepath)["codec"]
+
+
+def iter_blocks(filepath, record_id=None):
+    """Последовательно распаковывает блоки и возвращает их записи.
+
+    Если передан record_id, распаковываются только блоки, в диапазон ID
+    которых он попадает.
+    """
+    with open(get_compressed_path(filepath), 'rb') as f:
+        index = _read_index(f)
+        codec = get_codec(index["codec"])
+        columns = index.get("columns")
+        for offset, length, _count, min_id, max_id in index["blocks"]:
+            if record_id is not None and not min_id <= record_id <= max_id:
+                continue
+            f.seek(offset)
+            block = json.loads(codec.decompress(f.read(length)).decode('utf-8'))
+            if columns and block and isinstance(block[0], list):
+                block = decode_rows(columns, block)
+            yield block
+
+
+def write_blocks(
+    filepath, records, codec_name, block_size=DEFAULT_BLOCK_SIZE, fsync="none",
+    columns=None,
+):
+    """Записывает записи в сжатый файл блоками по block_size записей.
+
+    columns - пары [столбец, код типа] для компактного кодирования блоков.
+    """
+    codec = get_codec(codec_name)
+    index = {
+        "codec": codec_name,
+        "block_size": block_size,
+        "raw_size": 0,
+        "blocks": [],
+    }
+    if columns:
+        index["columns"] = columns
+
+    with atomic_write(get_compressed_path(filepath), 'wb', fsync) as f:
+        f.write(MAGIC)
+        for start in range(0, len(records), block_size):
+            block = records[start:start + block_size]
+            rows = encode_rows(columns, block) if columns else None
+            raw = json.dumps(
+                block if rows is None else rows,
+                ensure_ascii=False,
+                separators=(',', ':'),
+            ).encode('utf-8')
+            compressed = codec.compress(raw)
+            ids = [record.get("ID", 0) for record in block]
+            index["blocks"].append(
+                [f.tell(), len(compressed), len(block), min(ids), max(ids)]
+            )
+            index["raw_size"] += len(raw)
+            f.write(compressed)
+
+        encoded_index = json.dumps(index).encode('utf-8')
+        f.write(encoded_index)
+        f.write(len(encoded_index).to_bytes(TRAILER_SIZE, "big"))
+
+
+def load_records(filepath, where_clause=None):
+    """Загружает записи из обычного или сжатого файла данных.
+
+    Для сжатого файла условие по ID распаковывает только нужные блоки.
+    """
+    if not os.path.exists(get_compressed_path(filepath)):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    record_id = (where_clause or {}).get("ID")
+    if isinstance(record_id, bool) or not isinstance(record_id, int):
+        record_id = None
+    return [
+        record
+        for block in iter_blocks(filepath, record_id)
+        for record in block
+    ]
+
+
+def save_records(
+    filepath, records, codec_name=None, block_size=None, fsync="none",
+    columns=None,
+):
+    """Сохраняет записи в файл данных.
+
+    Без codec_name сохраняется текущий формат файла (кодек, размер блока и
+    столбцы). codec_name="none" переводит файл в обычный JSON.
+    """
+    dir_path = os.path.dirname(filepath) if os.path.dirname(filepath) else '.'
+    os.makedirs(dir_path, exist_ok=True)
+
+    if codec_name is None and os.path.exists(get_compressed_path(filepath)):
+        index = read_index(filepath)
+        codec_name = index["codec"]
+        block_size = block_size or index["block_size"]
+        columns = columns or index.get("columns")
+
+    if codec_name in (None, "none"):
+        with atomic_write(filepath, fsync=fsync) as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+        remove_file(get_compressed_path(filepath))
+        return
+
+    write_blocks(
+        filepath, records, codec_name, block_size or DEFAULT_BLOCK_SIZE, fsync,
+        columns,
+    )
+    remove_file(filepath)
+
+
+def remove_records(filepath):
+    """Удаляет файл данных в обоих форматах."""
+    removed = remove_file(filepath)
+    return remove_file(get_compressed_path(filepath)) or removed
+
+
+def remove_file(filepath):
+    if os.path.exists(filepath):
+        os.remove(filepath)
+        return True
+    return False
+
+
+def get_disk_size(filepath):
+    """Возвращает размер файла данных на диске в байтах."""
+    for path in (get_compressed_path(filepath), filepath):
+        if os.path.exists(path):
+            return os.path.getsize(path)
+    return 0
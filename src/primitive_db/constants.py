@@ -5,8 +5,41 @@
 DB_META_PATH = "db_meta.json"
 DATA_DIR = "data"
 
+# Бюджет времени импорта при запуске (--startup-profile), мс
+STARTUP_BUDGET_MS = 50
+STARTUP_PROFILE_TOP = 10
+
+# Разбиение таблиц на партиции
+LAYOUT_FILE = "_layout.json"
+LOCK_SUFFIX = ".lock"
+MOVES_LOCK = "_moves"
+PARTITION_SCHEMES = {"range", "hash"}
+
+# Сжатие файлов таблиц
+SUPPORTED_CODECS = {"zlib", "lzma", "bz2"}
+DEFAULT_BLOCK_SIZE = 256
+
+# Снимки для чтения и кэш результатов select
+SNAPSHOT_MAX_ATTEMPTS = 3
+SNAPSHOT_CACHE_RECORDS = 100_000
+SELECT_CACHE_ROWS = 50_000
+
+# Отложенная запись (write-behind)
+WRITEBACK_INTERVAL = 1.0
+WRITEBACK_MAX_CHANGES = 64
+FSYNC_POLICIES = ("none", "file", "full")
+
+# Резервные копии
+BACKUP_MANIFEST = "backup_manifest.json"
+BACKUP_OBJECTS_DIR = "objects"
+BACKUP_FORMAT = 2
+BACKUP_CHUNK_SIZE = 1024 * 1024
+BACKUP_MAX_ATTEMPTS = 3
+
 # Поддерживаемые типы данных
-SUPPORTED_TYPES = {"int", "str", "bool"}
+SUPPORTED_TYPES = {"int", "float", "str", "bool", "date"}
+NULLABLE_SUFFIX = "?"
+NULL_LITERAL = "null"
 
 # Автоматические колонки
 AUTO_ID_COLUMN = "ID:int"
@@ -17,7 +50,8 @@ ERROR_MESSAGES = {
     "table_not_exists": 'Ошибка: Таблица "{}" не существует.',
     "invalid_type": (
         'Некорректный тип данных: "{}". '
-        'Поддерживаемые типы: int, str, bool.'
+        'Поддерживаемые типы: int, float, str, bool, date '
+        '(с суффиксом ? столбец допускает null).'
     ),
     "unknown_command": 'Функции "{}" нет. Попробуйте снова.',
     "invalid_value": 'Некорректное значение: "{}". Попробуйте снова.',
@@ -26,6 +60,14 @@ ERROR_MESSAGES = {
         'количеству столбцов.'
     ),
     "no_records": 'Записей не найдено.',
+    "invalid_partition": (
+        'Некорректное партиционирование: "{}". Используйте: '
+        'partition by range ID <размер> | partition by hash <столбец> <число>'
+    ),
+    "invalid_codec": (
+        'Некорректный кодек: "{}". Поддерживаемые кодеки: zlib, lzma, bz2, none.'
+    ),
+    "partition_column": 'Ошибка: Столбец партиционирования "{}" не найден.',
 }
 
 # Help message для CRUD режима
@@ -33,6 +75,11 @@ CRUD_HELP_MESSAGE = """
 ***Операции с данными***
 Команды:
 <command> create_table <имя> <столбец1:тип> ... - создать таблицу
+    (типы: int, float, str, bool, date; тип? допускает значение null)
+<command> create_table <имя> <столбец1:тип> ... partition by range ID <размер> -
+    создать таблицу, разбитую на партиции по диапазонам ID.
+<command> create_table <имя> <столбец1:тип> ... partition by hash <столбец> <число> -
+    создать таблицу, разбитую на партиции по хешу столбца.
 
 <command> list_tables - показать все таблицы
 
@@ -53,6 +100,16 @@ exit - выход
 <command> delete from <имя_таблицы> where <столбец> = <значение> - 
     удалить запись.
 <command> info <имя_таблицы> - вывести информацию о таблице.
+<command> compress <имя_таблицы> <zlib|lzma|bz2|none> [размер_блока] -
+    сжать файлы таблицы блоками и показать степень сжатия.
+<command> writeback on [интервал_сек] [макс_изменений] [none|file|full] -
+    включить отложенную запись фоновым потоком.
+<command> writeback off - выключить отложенную запись (с записью на диск).
+<command> writeback - состояние отложенной записи.
+<command> flush - записать на диск все отложенные изменения.
+<command> backup <директория> - создать или обновить резервную копию базы
+    (копируются только измененные файлы).
+<command> restore <директория> - восстановить базу из резервной копии.
 <command> exit - выход из программы
 <command> help - справочная информация
 """
\ No newline at end of file
@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
-from prettytable import PrettyTable
-
-from .constants import AUTO_ID_COLUMN, ERROR_MESSAGES, SUPPORTED_TYPES
+from .constants import (
+    AUTO_ID_COLUMN,
+    ERROR_MESSAGES,
+    NULLABLE_SUFFIX,
+    SELECT_CACHE_ROWS,
+    SUPPORTED_TYPES,
+)
 from .decorators import confirm_action, create_cacher, handle_db_errors, log_time
+from .schema import get_data_columns, get_table_schema
+
+
+def count_result_rows(result):
+    """Возвращает число строк результата select для ограничения кэша."""
+    return max(len(getattr(result, "rows", ())), 1)
+
 
-cache_result = create_cacher()
+cache_result = create_cacher(SELECT_CACHE_ROWS, count_result_rows)
 
 
 @handle_db_errors
-def create_table(metadata, table_name, columns):
+def create_table(metadata, table_name, columns, partition_spec=None):
     """Создает новую таблицу."""
     if table_name in metadata:
         return False, ERROR_MESSAGES["table_exists"].format(table_name)
@@ -19,12 +30,24 @@ def create_table(metadata, table_name, columns):
             return False, ERROR_MESSAGES["invalid_value"].format(column)
         
         col_name, col_type = column.split(':', 1)
-        if col_type not in SUPPORTED_TYPES:
+        if col_type.removesuffix(NULLABLE_SUFFIX) not in SUPPORTED_TYPES:
             return False, ERROR_MESSAGES["invalid_type"].format(col_type)
         
         parsed_columns.append(f"{col_name}:{col_type}")
     
     final_columns = [AUTO_ID_COLUMN] + parsed_columns
+    
+    if partition_spec:
+        column_names = [col.split(':')[0] for col in final_columns]
+        if partition_spec["column"] not in column_names:
+            return False, ERROR_MESSAGES["partition_column"].format(
+                partition_spec["column"]
+            )
+        if partition_spec["scheme"] == "range" and partition_spec["column"] != "ID":
+            return False, ERROR_MESSAGES["invalid_partition"].format(
+                partition_spec["column"]
+            )
+    
     metadata[table_name] = final_columns
     
     columns_str = ", ".join(final_columns)
@@ -61,23 +84,19 @@ def insert(metadata, table_name, values):
     if table_name not in metadata:
         return False, ERROR_MESSAGES["table_not_exists"].format(table_name)
     
-    columns_without_id = get_columns_without_id(metadata, table_name)
+    columns_without_id = get_data_columns(get_table_schema(metadata, table_name))
     
+    # Типы уже проверены при преобразовании (parse_insert_values), повторно
+    # значения не проверяются
     if len(values) != len(columns_without_id):
         return False, ERROR_MESSAGES["invalid_insert"]
     
-    is_valid, error_msg = validate_data_types(columns_without_id, values)
-    if not is_valid:
-        return False, error_msg
-    
     return True, "Запись успешно добавлена"
 
 
 @handle_db_errors
 @log_time
-def select(metadata, table_data, where_clause=None):
-    cache_key = f"select_{id(metadata)}_{str(where_clause)}"
-    
+def select(metadata, table_data, where_clause=None, version=None):
     def _execute_select():
         if not table_data:
             return ERROR_MESSAGES["no_records"]
@@ -97,6 +116,9 @@ def select(metadata, table_data, where_clause=None):
         if not filtered_data:
             return ERROR_MESSAGES["no_records"]
         
+        # prettytable нужен только для вывода, импортируем при первом select
+        from prettytable import PrettyTable
+        
         table = PrettyTable()
         if metadata:
             table_name = list(metadata.keys())[0]
@@ -108,11 +130,19 @@ def select(metadata, table_data, where_clause=None):
         
         return table
     
+    if version is None:
+        # Без версии снимка данные не определены однозначно, кэш не нужен
+        return _execute_select()
+    
+    # Версия снимка однозначно определяет данные, результат можно кэшировать
+    cache_key = f"select_{version}_{str(where_clause)}"
     return cache_result(cache_key, _execute_select)
 
 
 @handle_db_errors
 def update(table_data, set_clause, where_clause):
+    # Измененные записи копируются, исходные данные не меняются
+    updated_data = []
     updated_count = 0
     
     for record in table_data:
@@ -124,11 +154,11 @@ def update(table_data, set_clause, where_clause):
                     break
         
         if match:
-            for col, val in set_clause.items():
-                record[col] = val
+            record = {**record, **set_clause}
             updated_count += 1
+        updated_data.append(record)
     
-    return table_data, updated_count
+    return updated_data, updated_count
 
 
 @handle_db_errors
@@ -156,16 +186,19 @@ def delete(table_data, where_clause):
 
 
 @handle_db_errors
-def get_table_info(metadata, table_name, table_data):
+def get_table_info(metadata, table_name, table_data, details=None):
     if table_name not in metadata:
         return ERROR_MESSAGES["table_not_exists"].format(table_name)
     
     columns_str = ", ".join(metadata[table_name])
     record_count = len(table_data)
     
-    return f"""Таблица: {table_name}
+    info = f"""Таблица: {table_name}
 Столбцы: {columns_str}
 Количество записей: {record_count}"""
+    for label, value in (details or {}).items():
+        info += f"\n{label}: {value}"
+    return info
 
 
 # Вспомогательные функции (без декораторов)
@@ -181,26 +214,3 @@ def get_columns_without_id(metadata, table_name):
     if table_name not in metadata:
         return []
     return [col for col in metadata[table_name] if not col.startswith("ID:")]
-
-
-def validate_data_types(columns, values):
-    for col, val in zip(columns, values):
-        col_name, col_type = col.split(':')
-        
-        if col_type == 'int' and not isinstance(val, int):
-            return False, (
-            f'Ожидается int для столбца {col_name}, '
-            f'получено {type(val).__name__}'
-        )
-        elif col_type == 'bool' and not isinstance(val, bool):
-            return False, (
-            f'Ожидается bool для столбца {col_name}, '
-            f'получено {type(val).__name__}'
-        )
-        elif col_type == 'str' and not isinstance(val, str):
-            return False, (
-            f'Ожидается str для столбца {col_name}, '
-            f'получено {type(val).__name__}'
-        )
-    
-    return True, None
\ No newline at end of file
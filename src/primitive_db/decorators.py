@@ -47,15 +47,31 @@ def log_time(func):
     return wrapper
 
 
-def create_cacher():
+def create_cacher(max_weight=None, weigh=None):
+    # При max_weight суммарный вес результатов (weigh(result), по умолчанию 1
+    # за результат) не превышает max_weight: давно не использованные
+    # результаты, в том числе ключи старых версий данных, вытесняются
     cache = {}
+    weights = {}
+    total_weight = 0
 
     def cache_result(key, value_func):
+        nonlocal total_weight
         if key in cache:
+            cache[key] = cache.pop(key)
             return cache[key]
         else:
             result = value_func()
+            weight = weigh(result) if weigh else 1
+            if max_weight is not None and weight > max_weight:
+                return result
             cache[key] = result
+            weights[key] = weight
+            total_weight += weight
+            while max_weight is not None and total_weight > max_weight:
+                oldest = next(iter(cache))
+                del cache[oldest]
+                total_weight -= weights.pop(oldest)
             return result
 
     return cache_result
\ No newline at end of file
@@ -1,8 +1,18 @@
 #!/usr/bin/env python3
 """Движок базы данных - основной цикл и парсинг команд."""
+import math
 import shlex
 
-from .constants import CRUD_HELP_MESSAGE, ERROR_MESSAGES
+from . import writeback
+from .constants import (
+    CRUD_HELP_MESSAGE,
+    DEFAULT_BLOCK_SIZE,
+    ERROR_MESSAGES,
+    FSYNC_POLICIES,
+    SUPPORTED_CODECS,
+    WRITEBACK_INTERVAL,
+    WRITEBACK_MAX_CHANGES,
+)
 from .core import (
     create_table,
     delete,
@@ -14,18 +24,32 @@ from .core import (
     update,
 )
 from .parser import (
-    get_expected_types,
+    get_raw_clause,
     parse_insert_values,
+    parse_partition_clause,
     parse_set_clause,
     parse_where_condition,
 )
+from .schema import (
+    coerce_clause,
+    get_block_columns,
+    get_data_columns,
+    get_table_schema,
+)
+from .storage import describe_layout, load_layout
 from .utils import (
+    append_record,
+    compress_table,
+    create_table_storage,
     delete_table_file,
     ensure_data_dir,
+    get_table_storage_info,
     load_metadata,
     load_table_data,
     save_metadata,
     save_table_data,
+    table_snapshot,
+    table_write_lock,
 )
 
 
@@ -34,6 +58,35 @@ def print_help():
     print(CRUD_HELP_MESSAGE)
 
 
+def print_flush_result(flushed, latency):
+    """Печатает результат записи отложенных изменений."""
+    if flushed:
+        print(f"Записано файлов: {flushed} за {latency:.3f} секунд.")
+
+
+def print_writeback_status():
+    """Печатает настройки и статистику отложенной записи."""
+    stats = writeback.get_stats()
+    mode = "включена" if stats["enabled"] else "выключена"
+    print(f"Отложенная запись {mode}.")
+    print(
+        f'Интервал: {stats["interval"]} с, порог: {stats["max_changes"]} изменений, '
+        f'fsync: {stats["fsync"]}.'
+    )
+    print(
+        f'Ожидают записи: файлов {stats["pending"]}, изменений '
+        f'{stats["pending_changes"]}, объединено изменений: '
+        f'{stats["coalesced"]}, сбросов: {stats["flushes"]}, '
+        f'записано файлов: {stats["files_written"]}.'
+    )
+    print(
+        f'Время сброса: последнее {stats["last_latency"]:.3f} с, '
+        f'максимальное {stats["max_latency"]:.3f} с.'
+    )
+    if stats["last_error"]:
+        print(f'Последняя ошибка записи: {stats["last_error"]}')
+
+
 def run():
     """Основной цикл программы."""
     ensure_data_dir()
@@ -52,6 +105,7 @@ def run():
             metadata = load_metadata()
             
             if command == "exit":
+                print_flush_result(*writeback.disable())
                 print("Выход из программы.")
                 break
                 
@@ -69,12 +123,27 @@ def run():
                 
                 table_name = args[0]
                 columns = args[1:]
+                partition_spec = None
+                
+                lowered = [arg.lower() for arg in columns]
+                if "partition" in lowered:
+                    partition_index = lowered.index("partition")
+                    try:
+                        partition_spec = parse_partition_clause(
+                            columns[partition_index:]
+                        )
+                    except ValueError as e:
+                        print(ERROR_MESSAGES["invalid_partition"].format(e))
+                        continue
+                    columns = columns[:partition_index]
                 
-                success, message = create_table(metadata, table_name, columns)
+                success, message = create_table(
+                    metadata, table_name, columns, partition_spec
+                )
                 print(message)
                 if success:
                     save_metadata(metadata)
-                    save_table_data(table_name, [])
+                    create_table_storage(table_name, partition_spec)
                     
             elif command == "drop_table":
                 if len(args) != 1:
@@ -107,34 +176,23 @@ def run():
                     continue
                 
                 table_name = args[1]
-                values_str = " ".join(args[3:])
+                values_str = get_raw_clause(user_input, "values")
+                
+                if table_name not in metadata:
+                    print(ERROR_MESSAGES["table_not_exists"].format(table_name))
+                    continue
                 
                 try:
-                    expected_types = get_expected_types(metadata, table_name)
-                    values = parse_insert_values(values_str, expected_types)
+                    columns = get_data_columns(get_table_schema(metadata, table_name))
+                    values = parse_insert_values(values_str, columns)
                     
-                    table_data = load_table_data(table_name)
                     success, message = insert(metadata, table_name, values)
                     
                     if success:
-                        if table_data:
-                            max_id = max(record.get("ID", 0) for record in table_data)
-                            new_id = max_id + 1
-                        else:
-                            new_id = 1
-                            
-                        columns_without_id = [
-                            col.split(':')[0] 
-                            for col in metadata[table_name] 
-                            if not col.startswith("ID:")
-                        ]
-                        
-                        new_record = {"ID": new_id}
-                        for col, val in zip(columns_without_id, values):
-                            new_record[col] = val
-                        
-                        table_data.append(new_record)
-                        save_table_data(table_name, table_data)
+                        new_id = append_record(
+                            table_name,
+                            {col.name: val for col, val in zip(columns, values)},
+                        )
                         msg = (
                             f'Запись с ID={new_id} успешно добавлена '
                             f'в таблицу "{table_name}".'
@@ -159,7 +217,7 @@ def run():
                 where_condition = None
                 
                 if len(args) > 3 and args[2].lower() == "where":
-                    where_str = " ".join(args[3:])
+                    where_str = get_raw_clause(user_input, "where")
                     try:
                         where_condition = parse_where_condition(where_str)
                     except Exception as e:
@@ -170,9 +228,20 @@ def run():
                     print(ERROR_MESSAGES["table_not_exists"].format(table_name))
                     continue
                 
-                table_data = load_table_data(table_name)
-                result = select(metadata, table_data, where_condition)
-                print(result)
+                try:
+                    where_condition = coerce_clause(
+                        get_table_schema(metadata, table_name), where_condition
+                    )
+                except ValueError as e:
+                    print(f"Ошибка: {e}")
+                    continue
+                
+                with table_snapshot(table_name, where_condition) as snapshot:
+                    table_data, version = snapshot
+                    result = select(
+                        metadata, table_data, where_condition, version
+                    )
+                    print(result)
                 
             elif command == "update":
                 if len(args) < 6:
@@ -184,8 +253,8 @@ def run():
                     continue
                 
                 try:
-                    set_index = args.index("set")
-                    where_index = args.index("where")
+                    set_str = get_raw_clause(user_input, "set", "where")
+                    where_str = get_raw_clause(user_input, "where")
                 except ValueError:
                     msg = (
                         "Ошибка: Неверный формат команды. Используйте: "
@@ -195,20 +264,29 @@ def run():
                     continue
                 
                 table_name = args[0]
-                set_str = " ".join(args[set_index+1:where_index])
-                where_str = " ".join(args[where_index+1:])
+                
+                if table_name not in metadata:
+                    print(ERROR_MESSAGES["table_not_exists"].format(table_name))
+                    continue
                 
                 try:
-                    set_clause = parse_set_clause(set_str)
-                    where_condition = parse_where_condition(where_str)
-                    
-                    table_data = load_table_data(table_name)
-                    updated_data, updated_count = update(
-                        table_data, set_clause, where_condition
+                    schema = get_table_schema(metadata, table_name)
+                    set_clause = coerce_clause(schema, parse_set_clause(set_str))
+                    where_condition = coerce_clause(
+                        schema, parse_where_condition(where_str)
                     )
                     
+                    with table_write_lock(table_name, where_condition, set_clause):
+                        table_data = load_table_data(table_name, where_condition)
+                        updated_data, updated_count = update(
+                            table_data, set_clause, where_condition
+                        )
+                        if updated_count > 0:
+                            save_table_data(
+                                table_name, updated_data, where_condition
+                            )
+                    
                     if updated_count > 0:
-                        save_table_data(table_name, updated_data)
                         msg = (
                             f'Обновлено {updated_count} записей '
                             f'в таблице "{table_name}".'
@@ -232,8 +310,7 @@ def run():
                 table_name = args[1]
                 
                 try:
-                    where_index = args.index("where")
-                    where_str = " ".join(args[where_index+1:])
+                    where_str = get_raw_clause(user_input, "where")
                 except ValueError:
                     msg = (
                         "Ошибка: Неверный формат команды. Используйте: "
@@ -242,15 +319,26 @@ def run():
                     print(msg)
                     continue
                 
+                if table_name not in metadata:
+                    print(ERROR_MESSAGES["table_not_exists"].format(table_name))
+                    continue
+                
                 try:
-                    where_condition = parse_where_condition(where_str)
-                    table_data = load_table_data(table_name)
-                    updated_data, deleted_count = delete(
-                        table_data, where_condition
+                    where_condition = coerce_clause(
+                        get_table_schema(metadata, table_name),
+                        parse_where_condition(where_str),
                     )
+                    with table_write_lock(table_name, where_condition):
+                        table_data = load_table_data(table_name, where_condition)
+                        updated_data, deleted_count = delete(
+                            table_data, where_condition
+                        )
+                        if deleted_count > 0:
+                            save_table_data(
+                                table_name, updated_data, where_condition
+                            )
                     
                     if deleted_count > 0:
-                        save_table_data(table_name, updated_data)
                         msg = (
                             f'Удалено {deleted_count} записей '
                             f'из таблицы "{table_name}".'
@@ -273,13 +361,127 @@ def run():
                 
                 table_name = args[0]
                 table_data = load_table_data(table_name)
-                result = get_table_info(metadata, table_name, table_data)
+                details = {}
+                layout = load_layout(table_name)
+                if layout:
+                    details["Партиционирование"] = describe_layout(layout)
+                
+                storage_info = get_table_storage_info(table_name)
+                if storage_info["codec"] != "none":
+                    details["Сжатие"] = (
+                        f'{storage_info["codec"]}, '
+                        f'блоки по {storage_info["block_size"]} записей'
+                    )
+                ratio = storage_info["raw_size"] / max(storage_info["disk_size"], 1)
+                details["Размер на диске"] = (
+                    f'{storage_info["disk_size"]} байт '
+                    f'(коэффициент сжатия {ratio:.2f})'
+                )
+                
+                result = get_table_info(metadata, table_name, table_data, details)
                 print(result)
                 
+            elif command == "compress":
+                if len(args) not in (2, 3):
+                    msg = (
+                        "Ошибка: Неверное количество аргументов. Используйте: "
+                        "compress <имя_таблицы> <zlib|lzma|bz2|none> [размер_блока]"
+                    )
+                    print(msg)
+                    continue
+                
+                table_name = args[0]
+                codec_name = args[1].lower()
+                if table_name not in metadata:
+                    print(ERROR_MESSAGES["table_not_exists"].format(table_name))
+                    continue
+                if codec_name not in SUPPORTED_CODECS | {"none"}:
+                    print(ERROR_MESSAGES["invalid_codec"].format(codec_name))
+                    continue
+                
+                try:
+                    block_size = int(args[2]) if len(args) == 3 else DEFAULT_BLOCK_SIZE
+                    if block_size <= 0:
+                        raise ValueError(args[2])
+                except ValueError:
+                    print(ERROR_MESSAGES["invalid_value"].format(args[2]))
+                    continue
+                
+                columns = get_block_columns(get_table_schema(metadata, table_name))
+                stats = compress_table(table_name, codec_name, block_size, columns)
+                ratio = stats["size_before"] / max(stats["size_after"], 1)
+                print(
+                    f'Таблица "{table_name}" сохранена с кодеком {codec_name}: '
+                    f'{stats["size_before"]} -> {stats["size_after"]} байт '
+                    f'(коэффициент {ratio:.2f}).'
+                )
+                print(
+                    f'Чтение {stats["records"]} записей: '
+                    f'{stats["read_before"]:.3f} -> {stats["read_after"]:.3f} секунд, '
+                    f'запись: {stats["write_time"]:.3f} секунд.'
+                )
+                
+            elif command in ("backup", "restore"):
+                if len(args) != 1:
+                    msg = (
+                        "Ошибка: Неверное количество аргументов. "
+                        f"Используйте: {command} <директория>"
+                    )
+                    print(msg)
+                    continue
+                
+                # backup нужен редко и тянет hashlib, импортируем по требованию
+                from .backup import backup_database, restore_database
+                
+                if command == "backup":
+                    success, message = backup_database(args[0])
+                else:
+                    success, message = restore_database(args[0])
+                print(message)
+                
+            elif command == "flush":
+                flushed, latency = writeback.flush()
+                if flushed:
+                    print_flush_result(flushed, latency)
+                else:
+                    print("Нет отложенных изменений.")
+                
+            elif command == "writeback":
+                if not args:
+                    print_writeback_status()
+                    continue
+                
+                mode = args[0].lower()
+                if mode == "off" and len(args) == 1:
+                    print_flush_result(*writeback.disable())
+                    print("Отложенная запись выключена.")
+                    continue
+                
+                try:
+                    if mode != "on" or len(args) > 4:
+                        raise ValueError(" ".join(args))
+                    interval = float(args[1]) if len(args) > 1 else WRITEBACK_INTERVAL
+                    max_changes = (
+                        int(args[2]) if len(args) > 2 else WRITEBACK_MAX_CHANGES
+                    )
+                    fsync = args[3].lower() if len(args) > 3 else "none"
+                    if (not math.isfinite(interval) or interval <= 0
+                            or max_changes <= 0):
+                        raise ValueError(" ".join(args))
+                    if fsync not in FSYNC_POLICIES:
+                        raise ValueError(fsync)
+                except ValueError as e:
+                    print(ERROR_MESSAGES["invalid_value"].format(e))
+                    continue
+                
+                writeback.enable(interval, max_changes, fsync)
+                print_writeback_status()
+                
             else:
                 print(ERROR_MESSAGES["unknown_command"].format(command))
                 
         except KeyboardInterrupt:
+            print_flush_result(*writeback.disable())
             print("\nВыход из программы.")
             break
         except Exception as e:
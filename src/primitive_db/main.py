@@ -1,12 +1,21 @@
 #!/usr/bin/env python3
-from .engine import run
+import sys
+
+STARTUP_PROFILE_FLAG = "--startup-profile"
 
 
 def main():
     """Main entry point for the application."""
+    if STARTUP_PROFILE_FLAG in sys.argv[1:]:
+        from .profiling import print_startup_profile
+        sys.exit(print_startup_profile())
+
+    # Движок импортируется только при реальном запуске цикла команд
+    from .engine import run
+
     print("DB project is running!")
     run()  
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -3,6 +3,24 @@
 import re
 import shlex
 
+from .constants import NULL_LITERAL, PARTITION_SCHEMES
+from .schema import convert_values
+
+
+def get_raw_clause(user_input, keyword, end_keyword=None):
+    """Возвращает текст команды после ключевого слова с кавычками значений.
+
+    Кавычки нужны, чтобы отличать строку "null" от значения null.
+    Если ключевого слова нет, выбрасывает ValueError.
+    """
+    pattern = rf"\s{keyword}\s+(.*)"
+    if end_keyword is not None:
+        pattern = rf"\s{keyword}\s+(.*?)\s+{end_keyword}\s"
+    match = re.search(pattern, user_input, re.IGNORECASE | re.DOTALL)
+    if not match:
+        raise ValueError(f"В команде нет ключевого слова {keyword}")
+    return match.group(1).strip()
+
 
 def parse_where_condition(condition_str):
     """Парсит условие WHERE в формате 'column = value'."""
@@ -10,7 +28,7 @@ def parse_where_condition(condition_str):
         return None
     
     try:
-        parts = shlex.split(condition_str)
+        parts = shlex.split(condition_str, posix=False)
         if len(parts) != 3 or parts[1] != '=':
             raise ValueError("Некорректный формат условия WHERE")
         
@@ -27,7 +45,7 @@ def parse_where_condition(condition_str):
 def parse_set_clause(set_str):
     """Парсит условие SET в формате 'column = value'."""
     try:
-        parts = shlex.split(set_str)
+        parts = shlex.split(set_str, posix=False)
         if len(parts) != 3 or parts[1] != '=':
             raise ValueError("Некорректный формат условия SET")
         
@@ -42,7 +60,12 @@ def parse_set_clause(set_str):
 
 
 def parse_value(value_str):
-    """Парсит значение с учетом типа."""
+    """Парсит значение с учетом типа.
+
+    Только null без кавычек означает NULL, "null" в кавычках - строка.
+    """
+    if value_str == NULL_LITERAL:
+        return None
     if value_str.lower() == 'true':
         return True
     elif value_str.lower() == 'false':
@@ -60,8 +83,12 @@ def parse_value(value_str):
     return value_str
 
 
-def parse_insert_values(values_str, expected_types):
-    """Парсит значения для INSERT в формате '(value1, value2, ...)'."""
+def parse_insert_values(values_str, columns):
+    """Парсит значения для INSERT в формате '(value1, value2, ...)'.
+
+    columns - скомпилированные столбцы схемы (без ID), по которым
+    значения преобразуются к нужным типам.
+    """
     if not values_str.startswith('(') or not values_str.endswith(')'):
         raise ValueError("Значения должны быть в скобках")
     
@@ -74,48 +101,33 @@ def parse_insert_values(values_str, expected_types):
     
     raw_values = [val.strip() for val in raw_values if val.strip()]
     
-    if len(raw_values) != len(expected_types):
+    if len(raw_values) != len(columns):
         msg = (
-            f"Ожидается {len(expected_types)} значений, "
+            f"Ожидается {len(columns)} значений, "
             f"получено {len(raw_values)}"
         )
         raise ValueError(msg)
     
-    converted_values = []
-    for i, (raw_val, expected_type) in enumerate(zip(raw_values, expected_types)):
-        try:
-            if expected_type == 'int':
-                converted_values.append(int(raw_val))
-            elif expected_type == 'bool':
-                if raw_val.lower() == 'true':
-                    converted_values.append(True)
-                elif raw_val.lower() == 'false':
-                    converted_values.append(False)
-                else:
-                    raise ValueError(f"Некорректное булево значение: {raw_val}")
-            else:  
-                if (raw_val.startswith('"') and raw_val.endswith('"')) or \
-                   (raw_val.startswith("'") and raw_val.endswith("'")):
-                    converted_values.append(raw_val[1:-1])
-                else:
-                    converted_values.append(raw_val)
-        except (ValueError, TypeError) as e:
-            raise ValueError(
-                f'Не удалось преобразовать значение "{raw_val}" '
-                f'к типу {expected_type}'
-            ) from e
-    
-    return converted_values
+    return convert_values(columns, raw_values)
 
 
-def get_expected_types(metadata, table_name):
-    """Возвращает ожидаемые типы для столбцов таблицы (без ID)."""
-    if table_name not in metadata:
-        return []
+def parse_partition_clause(tokens):
+    """Парсит условие partition by для create_table."""
+    clause = " ".join(tokens)
+    if (len(tokens) != 5 or tokens[0].lower() != 'partition'
+            or tokens[1].lower() != 'by'):
+        raise ValueError(clause)
+
+    scheme = tokens[2].lower()
+    column = 'ID' if tokens[3].lower() == 'id' else tokens[3]
+    try:
+        param = int(tokens[4])
+    except ValueError as e:
+        raise ValueError(clause) from e
+
+    if param <= 0 or scheme not in PARTITION_SCHEMES:
+        raise ValueError(clause)
     
-    types = []
-    for column in metadata[table_name]:
-        if not column.startswith("ID:"):
-            _, col_type = column.split(':')
-            types.append(col_type)
-    return types
\ No newline at end of file
+    # Для range параметр - число ID в партиции, для hash - число партиций
+    param_name = "size" if scheme == 'range' else "count"
+    return {"scheme": scheme, "column": column, param_name: param}
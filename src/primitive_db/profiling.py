@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Профилирование импорта модулей при запуске (аналог python -X importtime)."""
+import os
+import subprocess
+import sys
+
+from .constants import STARTUP_BUDGET_MS, STARTUP_PROFILE_TOP
+
+
+def collect_import_times(module_name):
+    """Импортирует модуль в чистом интерпретаторе и возвращает время импорта.
+
+    Возвращает список кортежей (модуль, собственное время, суммарное время)
+    в микросекундах в порядке завершения импорта.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        stderr_lines = result.stderr.strip().splitlines()
+        message = stderr_lines[-1] if stderr_lines else (
+            f"код возврата {result.returncode}"
+        )
+        raise RuntimeError(f"Не удалось импортировать {module_name}: {message}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def print_startup_profile(module_name=None):
+    """Печатает самые медленные импорты. Возвращает 1 при превышении бюджета."""
+    module_name = module_name or f"{__package__}.engine"
+    timings = collect_import_times(module_name)
+
+    total_ms = timings[-1][2] / 1000 if timings else 0.0
+    slowest = sorted(timings, key=lambda item: item[2], reverse=True)
+
+    print(f"Импорт {module_name}: {total_ms:.1f} мс "
+          f"(бюджет {STARTUP_BUDGET_MS} мс)")
+    print(f"{'суммарно, мс':>14} {'собств., мс':>12}  модуль")
+    for name, self_us, cumulative_us in slowest[:STARTUP_PROFILE_TOP]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>12.1f}  {name}")
+
+    if total_ms > STARTUP_BUDGET_MS:
+        print("Превышен бюджет времени запуска.")
+        return 1
+    return 0
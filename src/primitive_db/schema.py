@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Скомпилированные схемы таблиц: имя столбца, код типа и конвертер.
+
+Код типа задает компактное кодирование значений в сжатых блоках.
+"""
+import json
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+from .constants import NULL_LITERAL, NULLABLE_SUFFIX
+
+Column = namedtuple(
+    "Column", ["name", "type_name", "type_code", "nullable", "convert", "check"]
+)
+
+
+def _strip_quotes(raw):
+    if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in ('"', "'"):
+        return raw[1:-1]
+    return raw
+
+
+def _to_bool(raw):
+    lowered = raw.lower()
+    if lowered == 'true':
+        return True
+    if lowered == 'false':
+        return False
+    raise ValueError(f"Некорректное булево значение: {raw}")
+
+
+def _to_date(raw):
+    return date.fromisoformat(_strip_quotes(raw)).isoformat()
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_float(value):
+    return isinstance(value, float)
+
+
+def _is_bool(value):
+    return isinstance(value, bool)
+
+
+def _is_str(value):
+    return isinstance(value, str)
+
+
+def _is_date(value):
+    # Только каноническая форма YYYY-MM-DD: fromisoformat принимает и 20240102
+    if not isinstance(value, str):
+        return False
+    try:
+        return date.fromisoformat(value).isoformat() == value
+    except ValueError:
+        return False
+
+
+def _encode_bool(value):
+    if not _is_bool(value):
+        raise TypeError(value)
+    return int(value)
+
+
+def _encode_date(value):
+    if not _is_date(value):
+        raise ValueError(value)
+    return date.fromisoformat(value).toordinal()
+
+
+def _decode_date(value):
+    return date.fromordinal(value).isoformat()
+
+
+# Тип -> (код типа, конвертер из строки команды, проверка значения)
+TYPES = {
+    "int": ("i", int, _is_int),
+    "float": ("f", float, _is_float),
+    "bool": ("b", _to_bool, _is_bool),
+    "str": ("s", _strip_quotes, _is_str),
+    "date": ("d", _to_date, _is_date),
+}
+
+# Код типа -> (кодирование значения в блоке, декодирование). Значения
+# остальных типов хранятся в JSON как есть.
+ENCODINGS = {
+    "b": (_encode_bool, bool),
+    "d": (_encode_date, _decode_date),
+}
+
+
+def parse_column(column_def):
+    """Компилирует описание столбца вида 'имя:тип' или 'имя:тип?'."""
+    name, type_name = column_def.split(':', 1)
+    nullable = type_name.endswith(NULLABLE_SUFFIX)
+    base_type = type_name.removesuffix(NULLABLE_SUFFIX)
+    if base_type not in TYPES:
+        raise ValueError(f'Неизвестный тип "{base_type}" столбца {name}')
+
+    type_code, convert, check = TYPES[base_type]
+    return Column(name, base_type, type_code, nullable, convert, check)
+
+
+@lru_cache(maxsize=None)
+def compile_schema(column_defs):
+    """Компилирует кортеж описаний столбцов. Результат кэшируется."""
+    return tuple(parse_column(column_def) for column_def in column_defs)
+
+
+def get_table_schema(metadata, table_name):
+    """Возвращает скомпилированную схему таблицы из метаданных."""
+    return compile_schema(tuple(metadata[table_name]))
+
+
+def get_data_columns(schema):
+    """Возвращает столбцы схемы без автоматического ID."""
+    return [column for column in schema if column.name != "ID"]
+
+
+def convert_value(column, raw):
+    """Преобразует строковое значение команды к типу столбца.
+
+    null без кавычек дает NULL только для столбца, допускающего null.
+    Для остальных столбцов это обычное значение: строка "null" у str.
+    """
+    if raw == NULL_LITERAL and column.nullable:
+        return None
+    return column.convert(raw)
+
+
+def convert_values(columns, raw_values):
+    """Преобразует строки значений к типам столбцов одним проходом."""
+    converted = []
+    for column, raw in zip(columns, raw_values):
+        try:
+            converted.append(convert_value(column, raw))
+        except (ValueError, TypeError) as e:
+            raise ValueError(
+                f'Не удалось преобразовать значение "{raw}" '
+                f'к типу {column.type_name}'
+            ) from e
+    return converted
+
+
+def get_block_columns(schema):
+    """Возвращает пары [столбец, код типа] для компактных блоков."""
+    return [[column.name, column.type_code] for column in schema]
+
+
+def encode_rows(columns, records):
+    """Кодирует записи в строки значений в порядке столбцов.
+
+    Имена полей не повторяются в каждой записи, даты хранятся номером дня,
+    bool - числом 0/1. Если запись не укладывается в столбцы (лишнее поле
+    или значение не своего типа), возвращает None: блок хранится как есть.
+    """
+    names = [name for name, _code in columns]
+    encoders = [ENCODINGS.get(code, (None, None))[0] for _name, code in columns]
+    rows = []
+    try:
+        for record in records:
+            if not record.keys() <= set(names):
+                return None
+            rows.append([
+                value if value is None or encode is None else encode(value)
+                for value, encode in zip(map(record.get, names), encoders)
+            ])
+    except (ValueError, TypeError):
+        return None
+    return rows
+
+
+def decode_rows(columns, rows):
+    """Восстанавливает записи из строк, закодированных encode_rows."""
+    names = [name for name, _code in columns]
+    decoders = [ENCODINGS.get(code, (None, None))[1] for _name, code in columns]
+    return [
+        {
+            name: value if value is None or decode is None else decode(value)
+            for name, value, decode in zip(names, row, decoders)
+        }
+        for row in rows
+    ]
+
+
+def coerce_clause(schema, clause):
+    """Приводит значения условия WHERE/SET к типам столбцов схемы."""
+    if not clause:
+        return clause
+
+    columns = {column.name: column for column in schema}
+    coerced = {}
+    for name, value in clause.items():
+        column = columns.get(name)
+        if column is None:
+            coerced[name] = value
+        elif value is None:
+            # null без кавычек: NULL или обычное значение, как в convert_value
+            coerced[name] = convert_values([column], [NULL_LITERAL])[0]
+        elif column.check(value):
+            coerced[name] = value
+        else:
+            raw = value if isinstance(value, str) else json.dumps(value)
+            coerced[name] = convert_values([column], [raw])[0]
+    return coerced
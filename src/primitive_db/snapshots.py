@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Снимки файлов данных для чтения без блокировки писателей.
+
+Файлы данных заменяются атомарно, поэтому каждая версия файла определяется
+его сигнатурой (inode, время изменения, размер). Оператор чтения закрепляет
+снимок нужных файлов и работает с ним, пока писатели создают новые версии.
+Вытесненный снимок удаляется, когда его освобождает последний читатель.
+Снимок без читателей остается в памяти, только пока он актуален и общий
+объем снимков не превышает SNAPSHOT_CACHE_RECORDS записей.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from .blocks import get_compressed_path
+from .constants import SNAPSHOT_CACHE_RECORDS, SNAPSHOT_MAX_ATTEMPTS
+from .writeback import get_pending_signature, load_records
+
+_lock = threading.Lock()
+_current = {}
+_retired = []
+
+
+def get_file_signature(filepath):
+    """Возвращает сигнатуру текущей версии файла данных."""
+    pending_signature = get_pending_signature(filepath)
+    if pending_signature is not None:
+        return pending_signature
+
+    for path in (get_compressed_path(filepath), filepath):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        return (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    return None
+
+
+def _retire(snapshot):
+    if snapshot is not None and snapshot["readers"] > 0:
+        _retired.append(snapshot)
+
+
+def acquire_snapshot(filepath):
+    """Закрепляет снимок текущей версии файла и возвращает его."""
+    signature = get_file_signature(filepath)
+    with _lock:
+        current = _current.get(filepath)
+        if current is not None and current["signature"] == signature:
+            current["readers"] += 1
+            return current
+
+    try:
+        records = tuple(load_records(filepath))
+    except FileNotFoundError:
+        records = ()
+    snapshot = {
+        "filepath": filepath,
+        "signature": signature,
+        "records": records,
+        "readers": 1,
+    }
+
+    # Если файл заменили во время чтения, снимок не становится текущим
+    if get_file_signature(filepath) == signature:
+        with _lock:
+            _retire(_current.get(filepath))
+            _current[filepath] = snapshot
+    return snapshot
+
+
+def _cached_records():
+    return sum(len(snapshot["records"]) for snapshot in _current.values())
+
+
+def release_snapshot(snapshot):
+    """Освобождает снимок и удаляет версии без читателей.
+
+    Текущий снимок без читателей сохраняется для следующих операторов,
+    только если файл не изменился и кэш снимков не превышает лимит.
+    """
+    filepath = snapshot["filepath"]
+    is_live = get_file_signature(filepath) == snapshot["signature"]
+    with _lock:
+        snapshot["readers"] -= 1
+        _retired[:] = [old for old in _retired if old["readers"] > 0]
+        if snapshot["readers"] > 0 or _current.get(filepath) is not snapshot:
+            return
+        if not is_live or _cached_records() > SNAPSHOT_CACHE_RECORDS:
+            del _current[filepath]
+
+
+def forget_snapshots(filepaths):
+    """Убирает текущие снимки файлов, например после удаления таблицы."""
+    with _lock:
+        for filepath in filepaths:
+            _retire(_current.pop(filepath, None))
+
+
+def get_snapshot_stats():
+    """Возвращает число текущих и вытесненных, но еще читаемых снимков."""
+    with _lock:
+        return {"current": len(_current), "retired": len(_retired)}
+
+
+def _pin_file(filepath, where_clause):
+    """Закрепляет снимок одного файла. Возвращает (снимок, записи, сигнатура).
+
+    Поиск по ID в сжатом файле без актуального снимка читает только нужные
+    блоки, снимок при этом не создается и не закрепляется (None).
+    """
+    record_id = (where_clause or {}).get("ID")
+    signature = get_file_signature(filepath)
+    current = _current.get(filepath)
+    is_block_lookup = (
+        isinstance(record_id, int)
+        and signature is not None
+        and signature[0] != filepath
+        and (current is None or current["signature"] != signature)
+    )
+    if is_block_lookup:
+        return None, load_records(filepath, where_clause), signature
+
+    snapshot = acquire_snapshot(filepath)
+    return snapshot, snapshot["records"], snapshot["signature"]
+
+
+def _pin_files(filepaths, where_clause):
+    # Партиции закрепляются параллельно, как при полном просмотре таблицы
+    if len(filepaths) <= 1:
+        pinned = [_pin_file(filepath, where_clause) for filepath in filepaths]
+    else:
+        pinned = _pin_parallel(filepaths, where_clause)
+
+    records = [record for _snapshot, chunk, _sig in pinned for record in chunk]
+    snapshots = [snapshot for snapshot, _chunk, _sig in pinned if snapshot]
+    version = [signature for _snapshot, _chunk, signature in pinned]
+    return snapshots, records, version
+
+
+def _pin_parallel(filepaths, where_clause):
+    from concurrent.futures import ThreadPoolExecutor, wait
+
+    workers = min(len(filepaths), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_pin_file, filepath, where_clause)
+            for filepath in filepaths
+        ]
+        wait(futures)
+
+    # При ошибке освобождаются снимки, которые успели закрепить
+    errors = [future.exception() for future in futures if future.exception()]
+    if errors:
+        _release_all(
+            future.result()[0] for future in futures
+            if not future.exception() and future.result()[0]
+        )
+        raise errors[0]
+    return [future.result() for future in futures]
+
+
+def _release_all(snapshots):
+    for snapshot in snapshots:
+        release_snapshot(snapshot)
+
+
+@contextmanager
+def read_snapshot(filepaths, where_clause=None):
+    """Дает согласованные записи файлов на время одного оператора чтения.
+
+    Возвращает пару (записи, версия). Поиск по ID в сжатом файле без
+    актуального снимка читает только нужные блоки и снимок не создает.
+
+    После закрепления снимков сигнатуры всех файлов проверяются еще раз:
+    если какой-то файл изменился, чтение повторяется до SNAPSHOT_MAX_ATTEMPTS
+    раз. Если данные менялись все попытки, возвращаются последние прочитанные
+    записи (каждый файл согласован сам по себе) и версия None.
+    """
+    for attempt in range(1, SNAPSHOT_MAX_ATTEMPTS + 1):
+        snapshots, records, version = _pin_files(filepaths, where_clause)
+        is_consistent = all(
+            get_file_signature(filepath) == signature
+            for filepath, signature in zip(filepaths, version)
+        )
+        if is_consistent:
+            version = tuple(version)
+            break
+        if attempt == SNAPSHOT_MAX_ATTEMPTS:
+            version = None
+            break
+        _release_all(snapshots)
+
+    try:
+        yield records, version
+    finally:
+        _release_all(snapshots)
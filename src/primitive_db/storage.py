@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Хранение таблиц, разбитых на партиции по диапазону ID или хешу столбца."""
+import json
+import os
+import re
+import threading
+import zlib
+from contextlib import ExitStack, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки действуют только внутри процесса
+    fcntl = None
+
+from .blocks import atomic_write
+from .constants import DATA_DIR, LAYOUT_FILE, LOCK_SUFFIX, MOVES_LOCK
+from .writeback import (
+    get_pending_files,
+    load_records,
+    remove_records,
+    save_records,
+)
+
+PARTITION_FILE_PATTERN = re.compile(r"^p(\d+)\.jsonz?$")
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def get_table_dir_path(table_name):
+    """Возвращает путь к директории партиционированной таблицы."""
+    return os.path.join(DATA_DIR, table_name)
+
+
+def get_partition_file_path(table_name, partition_id):
+    """Возвращает путь к файлу партиции."""
+    return os.path.join(get_table_dir_path(table_name), f"p{partition_id}.json")
+
+
+def get_lock_file_path(table_name, partition_id):
+    """Возвращает путь к файлу блокировки партиции.
+
+    partition_id=None - блокировка обычной таблицы целиком.
+    """
+    if partition_id is None:
+        return os.path.join(DATA_DIR, table_name + LOCK_SUFFIX)
+    name = f"p{partition_id}" if isinstance(partition_id, int) else partition_id
+    return os.path.join(get_table_dir_path(table_name), name + LOCK_SUFFIX)
+
+
+def _get_lock_state(table_name, partition_id):
+    with _locks_guard:
+        key = (table_name, partition_id)
+        if key not in _locks:
+            _locks[key] = {"lock": threading.RLock(), "depth": 0, "file": None}
+        return _locks[key]
+
+
+@contextmanager
+def get_partition_lock(table_name, partition_id):
+    """Блокирует партицию для потоков этого и других процессов.
+
+    Между процессами блокировка держится через flock на файле .lock,
+    внутри процесса - через RLock, поэтому ее можно брать повторно.
+    """
+    state = _get_lock_state(table_name, partition_id)
+    with state["lock"]:
+        if state["depth"] == 0 and fcntl is not None:
+            lock_path = get_lock_file_path(table_name, partition_id)
+            os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+            state["file"] = open(lock_path, 'a')
+            fcntl.flock(state["file"].fileno(), fcntl.LOCK_EX)
+        state["depth"] += 1
+        try:
+            yield
+        finally:
+            state["depth"] -= 1
+            if state["depth"] == 0 and state["file"] is not None:
+                fcntl.flock(state["file"].fileno(), fcntl.LOCK_UN)
+                state["file"].close()
+                state["file"] = None
+
+
+@contextmanager
+def lock_partitions(table_name, partition_ids, moves=False):
+    """Удерживает блокировки партиций на время чтения, изменения и записи.
+
+    Блокировки берутся в порядке номеров партиций, чтобы избежать взаимной
+    блокировки писателей. moves=True сначала берет блокировку переноса
+    записей: изменение, переносящее записи, может занять новую партицию вне
+    этого порядка, поэтому такие изменения выполняются по одному.
+    """
+    with ExitStack() as stack:
+        if moves:
+            stack.enter_context(get_partition_lock(table_name, MOVES_LOCK))
+        for partition_id in sorted(set(partition_ids)):
+            stack.enter_context(get_partition_lock(table_name, partition_id))
+        yield
+
+
+def get_layout_lock(table_name):
+    """Возвращает блокировку описания партиций (счетчика ID).
+
+    Берется последней, после блокировок партиций.
+    """
+    return get_partition_lock(table_name, LAYOUT_FILE)
+
+
+def allocate_record_id(table_name):
+    """Резервирует ID для новой записи партиционированной таблицы."""
+    with get_layout_lock(table_name):
+        layout = load_layout(table_name)
+        layout["last_id"] += 1
+        save_layout(table_name, layout)
+        return layout["last_id"]
+
+
+def load_layout(table_name):
+    """Загружает описание партиций. Для обычной таблицы возвращает None."""
+    filepath = os.path.join(get_table_dir_path(table_name), LAYOUT_FILE)
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_layout(table_name, layout):
+    """Сохраняет описание партиций таблицы."""
+    dir_path = get_table_dir_path(table_name)
+    os.makedirs(dir_path, exist_ok=True)
+
+    with atomic_write(os.path.join(dir_path, LAYOUT_FILE)) as f:
+        json.dump(layout, f, ensure_ascii=False, indent=2)
+
+
+def create_partitioned_table(table_name, partition_spec):
+    """Создает пустую партиционированную таблицу."""
+    layout = dict(partition_spec)
+    layout["last_id"] = 0
+    save_layout(table_name, layout)
+
+
+def partition_of(layout, value):
+    """Возвращает номер партиции для значения столбца партиционирования."""
+    if layout["scheme"] == "range":
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"Некорректное значение ID: {value}")
+        return max(value - 1, 0) // layout["size"]
+
+    encoded = json.dumps(value, ensure_ascii=False).encode('utf-8')
+    return zlib.crc32(encoded) % layout["count"]
+
+
+def list_partitions(table_name, layout):
+    """Возвращает номера всех партиций таблицы."""
+    if layout["scheme"] == "hash":
+        return list(range(layout["count"]))
+
+    dir_path = get_table_dir_path(table_name)
+    partitions = []
+    for filename in os.listdir(dir_path) + get_pending_files(dir_path):
+        match = PARTITION_FILE_PATTERN.match(filename)
+        if match:
+            partitions.append(int(match.group(1)))
+    return sorted(set(partitions))
+
+
+def prune_partitions(table_name, layout, where_clause=None):
+    """Оставляет только партиции, которые могут содержать записи по условию."""
+    column = layout["column"]
+    if not where_clause or column not in where_clause:
+        return list_partitions(table_name, layout)
+
+    try:
+        return [partition_of(layout, where_clause[column])]
+    except ValueError:
+        return []
+
+
+def load_partition(table_name, partition_id):
+    """Загружает записи одной партиции.
+
+    Чтение не блокирует партицию: файлы заменяются атомарно. Для
+    изменения записи читаются под lock_partitions.
+    """
+    filepath = get_partition_file_path(table_name, partition_id)
+    try:
+        return load_records(filepath)
+    except FileNotFoundError:
+        return []
+
+
+def save_partition(table_name, partition_id, records, layout):
+    """Сохраняет записи одной партиции. Пустая партиция удаляется."""
+    filepath = get_partition_file_path(table_name, partition_id)
+    with get_partition_lock(table_name, partition_id):
+        if not records:
+            remove_records(filepath)
+            return
+
+        save_records(
+            filepath,
+            records,
+            layout.get("codec", "none"),
+            layout.get("block_size"),
+            layout.get("columns"),
+        )
+
+
+def load_partitioned_data(table_name, where_clause=None):
+    """Загружает записи партиций, подходящих под условие, параллельно."""
+    layout = load_layout(table_name)
+    partitions = prune_partitions(table_name, layout, where_clause)
+    if len(partitions) <= 1:
+        return [r for pid in partitions for r in load_partition(table_name, pid)]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = min(len(partitions), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(
+            lambda pid: load_partition(table_name, pid), partitions
+        )
+        return [record for chunk in chunks for record in chunk]
+
+
+def save_partitioned_data(table_name, records, where_clause=None):
+    """Сохраняет записи, загруженные по условию where_clause.
+
+    Перезаписываются только партиции, выбранные тем же условием. Записи,
+    которые после изменения попали в другую партицию, дописываются в нее.
+    """
+    layout = load_layout(table_name)
+    touched = prune_partitions(table_name, layout, where_clause)
+
+    groups = {}
+    for record in records:
+        pid = partition_of(layout, record.get(layout["column"]))
+        groups.setdefault(pid, []).append(record)
+
+    for pid in touched:
+        save_partition(table_name, pid, groups.pop(pid, []), layout)
+
+    for pid, moved in groups.items():
+        with get_partition_lock(table_name, pid):
+            existing = load_partition(table_name, pid)
+            save_partition(table_name, pid, existing + moved, layout)
+
+    max_id = max((record.get("ID", 0) for record in records), default=0)
+    with get_layout_lock(table_name):
+        layout = load_layout(table_name)
+        if max_id > layout["last_id"]:
+            layout["last_id"] = max_id
+            save_layout(table_name, layout)
+
+
+def get_partition_files(table_name, where_clause=None):
+    """Возвращает пути файлов партиций, подходящих под условие."""
+    layout = load_layout(table_name)
+    return [
+        get_partition_file_path(table_name, pid)
+        for pid in prune_partitions(table_name, layout, where_clause)
+    ]
+
+
+def set_partitions_codec(table_name, codec_name, block_size, columns=None):
+    """Перезаписывает все партиции таблицы с новым кодеком.
+
+    columns - пары [столбец, код типа] для компактного кодирования блоков.
+    """
+    with get_layout_lock(table_name):
+        layout = load_layout(table_name)
+        layout["codec"] = codec_name
+        layout["block_size"] = block_size
+        layout["columns"] = columns
+        for pid in list_partitions(table_name, layout):
+            with get_partition_lock(table_name, pid):
+                records = load_partition(table_name, pid)
+                save_partition(table_name, pid, records, layout)
+        save_layout(table_name, layout)
+
+
+def describe_layout(layout):
+    """Возвращает описание партиционирования для вывода пользователю."""
+    if layout["scheme"] == "range":
+        return f'range({layout["column"]}), по {layout["size"]} записей'
+    return f'hash({layout["column"]}), {layout["count"]} партиций'
@@ -2,8 +2,27 @@
 """Вспомогательные функции для работы с файлами."""
 import json
 import os
+import time
+from contextlib import contextmanager
 
-from .constants import DATA_DIR, DB_META_PATH
+from .blocks import atomic_write, get_disk_size, get_file_codec, read_index
+from .constants import DATA_DIR, DB_META_PATH, DEFAULT_BLOCK_SIZE
+from .snapshots import forget_snapshots, read_snapshot
+from .storage import (
+    allocate_record_id,
+    create_partitioned_table,
+    get_partition_files,
+    get_table_dir_path,
+    list_partitions,
+    load_layout,
+    load_partitioned_data,
+    lock_partitions,
+    partition_of,
+    prune_partitions,
+    save_partitioned_data,
+    set_partitions_codec,
+)
+from .writeback import discard, flush, load_records, remove_records, save_records
 
 
 def load_metadata(filepath=DB_META_PATH):
@@ -20,42 +39,192 @@ def save_metadata(data, filepath=DB_META_PATH):
     dir_path = os.path.dirname(filepath) if os.path.dirname(filepath) else '.'
     os.makedirs(dir_path, exist_ok=True)
     
-    with open(filepath, 'w', encoding='utf-8') as f:
+    with atomic_write(filepath) as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 
-def load_table_data(table_name):
-    """Загружает данные таблицы из JSON-файла."""
+def load_table_data(table_name, where_clause=None):
+    """Загружает данные таблицы из JSON-файла.
+
+    Для партиционированной таблицы загружаются только партиции, которые
+    могут содержать записи, подходящие под where_clause. Возвращается
+    собственная копия записей, которую можно изменять и сохранять.
+    """
+    if load_layout(table_name) is not None:
+        return load_partitioned_data(table_name, where_clause)
+
     filepath = get_table_file_path(table_name)
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_records(filepath)
     except FileNotFoundError:
         return []
 
 
-def save_table_data(table_name, data):
-    """Сохраняет данные таблицы в JSON-файл."""
-    filepath = get_table_file_path(table_name)
-    dir_path = os.path.dirname(filepath) if os.path.dirname(filepath) else '.'
-    os.makedirs(dir_path, exist_ok=True)
-    
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def table_snapshot(table_name, where_clause=None):
+    """Возвращает контекст чтения согласованного снимка таблицы.
+
+    Контекст дает пару (записи, версия); записи изменять нельзя.
+    """
+    return read_snapshot(get_table_data_files(table_name, where_clause), where_clause)
+
+
+def save_table_data(table_name, data, where_clause=None):
+    """Сохраняет данные таблицы в JSON-файл.
+
+    where_clause должен совпадать с условием, по которому данные были
+    загружены: для партиционированной таблицы перезаписываются только
+    соответствующие партиции.
+    """
+    if load_layout(table_name) is not None:
+        save_partitioned_data(table_name, data, where_clause)
+        return
+
+    save_records(get_table_file_path(table_name), data)
+
+
+def create_table_storage(table_name, partition_spec=None):
+    """Создает пустое хранилище для новой таблицы."""
+    if partition_spec:
+        create_partitioned_table(table_name, partition_spec)
+    else:
+        save_table_data(table_name, [])
+
+
+@contextmanager
+def table_write_lock(table_name, where_clause=None, set_clause=None):
+    """Блокирует изменяемую часть таблицы на время чтения, изменения и записи.
+
+    Обычная таблица блокируется целиком, у партиционированной - только
+    партиции, подходящие под where_clause (или все, если set_clause меняет
+    столбец партиционирования и записи могут переехать). Блокировки
+    файловые и действуют между процессами.
+    """
+    layout = load_layout(table_name)
+    moves = False
+    if layout is None:
+        partition_ids = [None]
+    elif set_clause and layout["column"] in set_clause:
+        moves = True
+        partition_ids = list_partitions(table_name, layout)
+    else:
+        partition_ids = prune_partitions(table_name, layout, where_clause)
+
+    with lock_partitions(table_name, partition_ids, moves):
+        yield
+
+
+def append_record(table_name, values):
+    """Добавляет запись в таблицу, назначая ей ID. Возвращает новый ID.
+
+    В партиционированной таблице перезаписывается и блокируется только
+    партиция, в которую попадает новая запись.
+    """
+    layout = load_layout(table_name)
+    if layout is not None:
+        new_record = {"ID": allocate_record_id(table_name), **values}
+        partition_id = partition_of(layout, new_record[layout["column"]])
+        with lock_partitions(table_name, [partition_id]):
+            table_data = load_table_data(table_name, new_record)
+            table_data.append(new_record)
+            save_table_data(table_name, table_data, new_record)
+        return new_record["ID"]
+
+    with table_write_lock(table_name):
+        table_data = load_table_data(table_name)
+        max_id = max((record.get("ID", 0) for record in table_data), default=0)
+        new_record = {"ID": max_id + 1, **values}
+        table_data.append(new_record)
+        save_table_data(table_name, table_data)
+    return new_record["ID"]
 
 
 def delete_table_file(table_name):
     """Удаляет файл данных таблицы."""
     filepath = get_table_file_path(table_name)
+    data_files = get_table_data_files(table_name)
+    discard(data_files)
+    forget_snapshots(data_files)
     try:
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        dir_path = get_table_dir_path(table_name)
+        if os.path.isdir(dir_path):
+            # shutil тянет за собой bz2 и lzma, нужен только при удалении
+            import shutil
+
+            shutil.rmtree(dir_path)
             return True
+        return remove_records(filepath)
     except Exception:
         pass
     return False
 
 
+def get_table_data_files(table_name, where_clause=None):
+    """Возвращает пути файлов данных таблицы (без суффикса сжатия).
+
+    Для партиционированной таблицы учитывается отсечение партиций по условию.
+    """
+    if load_layout(table_name) is None:
+        return [get_table_file_path(table_name)]
+    return get_partition_files(table_name, where_clause)
+
+
+def get_table_storage_info(table_name):
+    """Возвращает кодек, размер на диске и несжатый размер данных таблицы."""
+    info = {"codec": "none", "block_size": None, "disk_size": 0, "raw_size": 0}
+    for filepath in get_table_data_files(table_name):
+        disk_size = get_disk_size(filepath)
+        info["disk_size"] += disk_size
+        if get_file_codec(filepath) is None:
+            info["raw_size"] += disk_size
+            continue
+        index = read_index(filepath)
+        info["codec"] = index["codec"]
+        info["block_size"] = index["block_size"]
+        info["raw_size"] += index["raw_size"]
+    return info
+
+
+def compress_table(table_name, codec_name, block_size=DEFAULT_BLOCK_SIZE,
+                   columns=None):
+    """Перезаписывает таблицу с новым кодеком и замеряет чтение и запись.
+
+    columns - пары [столбец, код типа]: с ними блоки кодируются компактно.
+    """
+    # Замеры делаются по файлам на диске, отложенные изменения записываются
+    flush()
+    before = get_table_storage_info(table_name)
+    start = time.monotonic()
+    table_data = load_table_data(table_name)
+    read_before = time.monotonic() - start
+
+    start = time.monotonic()
+    if load_layout(table_name) is not None:
+        set_partitions_codec(table_name, codec_name, block_size, columns)
+    else:
+        save_records(
+            get_table_file_path(table_name),
+            table_data,
+            codec_name,
+            block_size,
+            columns,
+        )
+    flush()
+    write_time = time.monotonic() - start
+
+    start = time.monotonic()
+    load_table_data(table_name)
+    read_after = time.monotonic() - start
+
+    return {
+        "records": len(table_data),
+        "size_before": before["disk_size"],
+        "size_after": get_table_storage_info(table_name)["disk_size"],
+        "read_before": read_before,
+        "read_after": read_after,
+        "write_time": write_time,
+    }
+
+
 def ensure_data_dir():
     """Создает директорию для данных если не существует."""
     os.makedirs(DATA_DIR, exist_ok=True)
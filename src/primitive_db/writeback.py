@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Отложенная запись файлов данных фоновым потоком (write-behind).
+
+Когда режим включен, сохранение файла только запоминает его новое
+содержимое. Повторные изменения одного файла объединяются, а фоновый поток
+записывает их на диск по интервалу, при достижении порога незаписанных
+изменений (объединенные изменения тоже считаются) или по команде flush/exit.
+Чтение видит ожидающие изменения.
+"""
+import atexit
+import math
+import os
+import threading
+import time
+
+from . import blocks
+from .constants import WRITEBACK_INTERVAL, WRITEBACK_MAX_CHANGES
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wakeup = threading.Event()
+_pending = {}
+_generation = 0
+_thread = None
+_atexit_registered = False
+
+_config = {
+    "enabled": False,
+    "interval": WRITEBACK_INTERVAL,
+    "max_changes": WRITEBACK_MAX_CHANGES,
+    "fsync": "none",
+}
+_stats = {
+    "flushes": 0,
+    "files_written": 0,
+    "coalesced": 0,
+    "last_latency": 0.0,
+    "max_latency": 0.0,
+    "last_error": None,
+}
+
+
+def enable(interval=WRITEBACK_INTERVAL, max_changes=WRITEBACK_MAX_CHANGES,
+           fsync="none"):
+    """Включает отложенную запись и запускает фоновый поток."""
+    global _thread, _atexit_registered
+    if not math.isfinite(interval) or interval <= 0 or max_changes <= 0:
+        raise ValueError(f"Некорректные параметры: {interval}, {max_changes}")
+    _config.update(
+        enabled=True, interval=interval, max_changes=max_changes, fsync=fsync
+    )
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(
+            target=_flusher_loop, name="writeback-flusher", daemon=True
+        )
+        _thread.start()
+    if not _atexit_registered:
+        atexit.register(flush)
+        _atexit_registered = True
+
+
+def disable():
+    """Выключает отложенную запись, записав все ожидающие изменения."""
+    global _thread
+    _config["enabled"] = False
+    _wakeup.set()
+    if _thread is not None:
+        _thread.join()
+        _thread = None
+    return flush()
+
+
+def _flusher_loop():
+    while _config["enabled"]:
+        try:
+            _wakeup.wait(_config["interval"])
+            _wakeup.clear()
+            # Последний сброс при выключении выполняет disable()
+            if not _config["enabled"]:
+                break
+            flush()
+        except Exception as e:
+            _stats["last_error"] = str(e)
+            # Повтор после ошибки - через стандартный интервал, чтобы поток
+            # не завершился и не зациклился
+            _wakeup.wait(WRITEBACK_INTERVAL)
+
+
+def flush():
+    """Записывает ожидающие изменения. Возвращает число и время записи."""
+    with _flush_lock:
+        with _lock:
+            batch = dict(_pending)
+        if not batch:
+            return 0, 0.0
+
+        start = time.monotonic()
+        for filepath, entry in batch.items():
+            records, codec_name, block_size, generation, _changes, columns = entry
+            blocks.save_records(
+                filepath, records, codec_name, block_size, _config["fsync"],
+                columns,
+            )
+            with _lock:
+                # Если файл изменили во время записи, он остается в очереди
+                if filepath in _pending and _pending[filepath][3] == generation:
+                    del _pending[filepath]
+        latency = time.monotonic() - start
+
+        _stats["flushes"] += 1
+        _stats["files_written"] += len(batch)
+        _stats["last_latency"] = latency
+        _stats["max_latency"] = max(_stats["max_latency"], latency)
+        _stats["last_error"] = None
+        return len(batch), latency
+
+
+def load_records(filepath, where_clause=None):
+    """Загружает записи файла с учетом ожидающих изменений."""
+    with _lock:
+        entry = _pending.get(filepath)
+    if entry is not None:
+        return list(entry[0])
+    return blocks.load_records(filepath, where_clause)
+
+
+def save_records(filepath, records, codec_name=None, block_size=None,
+                 columns=None):
+    """Сохраняет записи сразу или ставит их в очередь отложенной записи."""
+    if not _config["enabled"]:
+        blocks.save_records(
+            filepath, records, codec_name, block_size, columns=columns
+        )
+        return
+
+    global _generation
+    with _lock:
+        previous = _pending.get(filepath)
+        changes = 1
+        if previous is not None:
+            _stats["coalesced"] += 1
+            changes += previous[4]
+            if codec_name is None:
+                codec_name, block_size = previous[1], previous[2]
+                columns = columns or previous[5]
+        _generation += 1
+        _pending[filepath] = (
+            list(records), codec_name, block_size, _generation, changes, columns
+        )
+        pending_changes = _count_changes()
+
+    # Порог считает каждое изменение, поэтому одна часто изменяемая таблица
+    # тоже вызывает сброс
+    if pending_changes >= _config["max_changes"]:
+        _wakeup.set()
+
+
+def _count_changes():
+    return sum(entry[4] for entry in _pending.values())
+
+
+def remove_records(filepath):
+    """Удаляет файл данных и отменяет его ожидающие изменения."""
+    with _flush_lock, _lock:
+        discarded = _pending.pop(filepath, None) is not None
+        return blocks.remove_records(filepath) or discarded
+
+
+def discard(filepaths):
+    """Отменяет ожидающие изменения файлов (например, удаленной таблицы)."""
+    with _flush_lock, _lock:
+        for filepath in filepaths:
+            _pending.pop(filepath, None)
+
+
+def clear_pending():
+    """Отменяет все ожидающие изменения."""
+    with _flush_lock, _lock:
+        _pending.clear()
+
+
+def get_pending_signature(filepath):
+    """Возвращает сигнатуру ожидающей версии файла или None."""
+    with _lock:
+        entry = _pending.get(filepath)
+    if entry is None:
+        return None
+    return (filepath, "pending", entry[3])
+
+
+def get_pending_files(dir_path):
+    """Возвращает имена ожидающих записи файлов в директории."""
+    with _lock:
+        return [
+            os.path.basename(filepath)
+            for filepath in _pending
+            if os.path.dirname(filepath) == dir_path
+        ]
+
+
+def get_stats():
+    """Возвращает настройки и статистику отложенной записи."""
+    with _lock:
+        pending = len(_pending)
+        pending_changes = _count_changes()
+    return {
+        **_config,
+        **_stats,
+        "pending": pending,
+        "pending_changes": pending_changes,
+    }
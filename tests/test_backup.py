@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Проверка путей резервного копирования и восстановления."""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.primitive_db import backup
+from src.primitive_db.backup import backup_database, restore_database
+from src.primitive_db.constants import BACKUP_MANIFEST
+
+
+class BackupPathsTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._tmp.name, "db")
+        os.makedirs(os.path.join(self.root, "data"))
+        os.chdir(self.root)
+        with open("db_meta.json", "w", encoding="utf-8") as f:
+            json.dump({"t": ["ID:int"]}, f)
+        with open(os.path.join("data", "t.json"), "w", encoding="utf-8") as f:
+            json.dump([{"ID": 1}], f)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def restore(self, backup_dir):
+        with mock.patch("builtins.input", return_value="y"):
+            return restore_database(backup_dir)
+
+    def test_backup_and_restore(self):
+        self.assertTrue(backup_database("../backup")[0])
+        os.remove(os.path.join("data", "t.json"))
+        self.assertTrue(self.restore("../backup")[0])
+        self.assertTrue(os.path.exists(os.path.join("data", "t.json")))
+
+    def write_table(self, records):
+        with open(os.path.join("data", "t.json"), "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+    def read_table(self):
+        with open(os.path.join("data", "t.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_incremental_backup_copies_only_changed_files(self):
+        backup_database("../backup")
+        self.write_table([{"ID": 1}, {"ID": 2}])
+        success, message = backup_database("../backup")
+
+        self.assertTrue(success)
+        self.assertIn("скопировано файлов 1", message)
+        objects = os.listdir(os.path.join("..", "backup", "objects"))
+        self.assertEqual(len(objects), 2)
+        self.assertTrue(self.restore("../backup")[0])
+        self.assertEqual(self.read_table(), [{"ID": 1}, {"ID": 2}])
+
+    def test_failed_backup_keeps_previous_copy(self):
+        self.assertTrue(backup_database("../backup")[0])
+        self.write_table([{"ID": 1}, {"ID": 2}])
+
+        # Версии файлов меняются при каждой проверке: данные "все время
+        # меняются", и ни одна попытка не дает согласованной копии
+        versions = iter(range(10**6))
+        with mock.patch.object(
+            backup, "get_file_version", side_effect=lambda path: [next(versions)]
+        ):
+            self.assertFalse(backup_database("../backup")[0])
+
+        self.assertTrue(self.restore("../backup")[0])
+        self.assertEqual(self.read_table(), [{"ID": 1}])
+
+    def test_interrupted_backup_keeps_previous_copy(self):
+        self.assertTrue(backup_database("../backup")[0])
+        self.write_table([{"ID": 1}, {"ID": 2}])
+
+        with mock.patch.object(backup, "atomic_write", side_effect=OSError):
+            self.assertFalse(backup_database("../backup")[0])
+
+        self.assertTrue(self.restore("../backup")[0])
+        self.assertEqual(self.read_table(), [{"ID": 1}])
+
+    def test_backup_dir_overlapping_database_is_rejected(self):
+        for backup_dir in (".", "..", self.root, "data/copy"):
+            self.assertFalse(backup_database(backup_dir)[0], backup_dir)
+            self.assertFalse(self.restore(backup_dir)[0], backup_dir)
+
+    def test_manifest_paths_outside_database_are_rejected(self):
+        self.assertTrue(backup_database("../backup")[0])
+        manifest_path = os.path.join("..", "backup", BACKUP_MANIFEST)
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        entry = manifest["files"]["data/t.json"]
+
+        victim = os.path.join(self._tmp.name, "victim.json")
+        for key in ("../victim.json", "data/../../victim.json", victim, "data"):
+            manifest["files"] = {key: entry, "data/t.json": entry}
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+            self.assertFalse(self.restore("../backup")[0], key)
+            self.assertFalse(backup_database("../backup")[0], key)
+            self.assertFalse(os.path.exists(victim))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Проверка сжатого блочного формата .jsonz."""
+import os
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+from src.primitive_db import blocks
+from src.primitive_db.blocks import (
+    get_compressed_path,
+    get_file_codec,
+    load_records,
+    read_index,
+    save_records,
+)
+
+RECORDS = [{"ID": i, "name": f"имя {i}", "score": i * 1.5} for i in range(1, 51)]
+
+
+class BlockFormatTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        self.path = "t.json"
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_round_trip_for_each_codec(self):
+        for codec_name in ("zlib", "lzma", "bz2"):
+            with self.subTest(codec=codec_name):
+                save_records(self.path, RECORDS, codec_name, 8)
+                self.assertEqual(load_records(self.path), RECORDS)
+                index = read_index(self.path)
+                self.assertEqual(index["codec"], codec_name)
+                self.assertEqual(len(index["blocks"]), 7)
+
+    def test_switching_codec_removes_other_file(self):
+        save_records(self.path, RECORDS, "zlib")
+        self.assertTrue(os.path.exists(get_compressed_path(self.path)))
+        self.assertFalse(os.path.exists(self.path))
+
+        save_records(self.path, RECORDS, "none")
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(get_compressed_path(self.path)))
+        self.assertEqual(load_records(self.path), RECORDS)
+
+    def test_plain_save_keeps_codec(self):
+        save_records(self.path, RECORDS, "lzma", 16)
+        save_records(self.path, RECORDS[:20])
+
+        self.assertEqual(get_file_codec(self.path), "lzma")
+        self.assertEqual(read_index(self.path)["block_size"], 16)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(load_records(self.path), RECORDS[:20])
+
+    def test_typed_columns_are_encoded_compactly(self):
+        records = [
+            {"ID": i, "day": f"2024-01-{i:02d}", "ok": i % 2 == 0}
+            for i in range(1, 29)
+        ]
+        columns = [["ID", "i"], ["day", "d"], ["ok", "b"]]
+        save_records(self.path, records, "zlib", 8, columns=columns)
+        compact_size = read_index(self.path)["raw_size"]
+        save_records(self.path, records[:20])
+
+        self.assertEqual(read_index(self.path)["columns"], columns)
+        self.assertEqual(load_records(self.path), records[:20])
+
+        save_records(self.path, records, "zlib", 8)
+        self.assertLess(compact_size, read_index(self.path)["raw_size"] / 2)
+
+    def test_id_lookup_inflates_one_block(self):
+        save_records(self.path, RECORDS, "zlib", 10)
+        codec = mock.Mock(decompress=mock.Mock(side_effect=zlib.decompress))
+
+        with mock.patch.object(blocks, "get_codec", return_value=codec):
+            records = load_records(self.path, {"ID": 23})
+        self.assertEqual(codec.decompress.call_count, 1)
+        self.assertEqual([r["ID"] for r in records], list(range(21, 31)))
+
+        with mock.patch.object(blocks, "get_codec", return_value=codec):
+            load_records(self.path)
+        self.assertEqual(codec.decompress.call_count, 1 + 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
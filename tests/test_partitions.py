@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Проверка партиционированных таблиц: отсечение, перенос, ID, блокировки."""
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from src.primitive_db.storage import (
+    fcntl,
+    get_partition_file_path,
+    list_partitions,
+    load_layout,
+    partition_of,
+)
+from src.primitive_db.utils import (
+    append_record,
+    create_table_storage,
+    load_table_data,
+    save_table_data,
+    table_write_lock,
+)
+
+RANGE_SPEC = {"scheme": "range", "column": "ID", "size": 2}
+HASH_SPEC = {"scheme": "hash", "column": "name", "count": 4}
+
+
+def _insert_many(table_name, count):
+    for i in range(count):
+        append_record(table_name, {"name": f"n{os.getpid()}_{i % 5}"})
+
+
+class PartitionTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def update(self, table_name, where_clause, set_clause):
+        with table_write_lock(table_name, where_clause, set_clause):
+            records = load_table_data(table_name, where_clause)
+            for record in records:
+                if all(record.get(k) == v for k, v in where_clause.items()):
+                    record.update(set_clause)
+            save_table_data(table_name, records, where_clause)
+
+    def test_range_pruning(self):
+        create_table_storage("r", RANGE_SPEC)
+        ids = [append_record("r", {"name": str(i)}) for i in range(5)]
+
+        self.assertEqual(ids, [1, 2, 3, 4, 5])
+        self.assertEqual(list_partitions("r", load_layout("r")), [0, 1, 2])
+        self.assertEqual(
+            [r["ID"] for r in load_table_data("r", {"ID": 3})], [3, 4]
+        )
+        self.assertEqual(len(load_table_data("r")), 5)
+
+    def test_hash_pruning(self):
+        create_table_storage("h", HASH_SPEC)
+        for name in ("a", "b", "c", "d", "a"):
+            append_record("h", {"name": name})
+
+        layout = load_layout("h")
+        records = load_table_data("h", {"name": "a"})
+        self.assertEqual(
+            {partition_of(layout, r["name"]) for r in records},
+            {partition_of(layout, "a")},
+        )
+        self.assertEqual(sum(r["name"] == "a" for r in records), 2)
+        self.assertEqual(len(load_table_data("h")), 5)
+
+    def test_update_moves_row_to_new_partition(self):
+        create_table_storage("h", HASH_SPEC)
+        layout = load_layout("h")
+        target = next(
+            name for name in "bcdefgh"
+            if partition_of(layout, name) != partition_of(layout, "a")
+        )
+        append_record("h", {"name": "a"})
+        append_record("h", {"name": target})
+
+        self.update("h", {"name": "a"}, {"name": target})
+
+        self.assertEqual(load_table_data("h", {"name": "a"}), [])
+        moved = load_table_data("h", {"name": target})
+        self.assertEqual(sorted(r["ID"] for r in moved), [1, 2])
+        self.assertEqual(len(load_table_data("h")), 2)
+
+    def test_save_without_where_rewrites_all_partitions(self):
+        create_table_storage("r", RANGE_SPEC)
+        for i in range(4):
+            append_record("r", {"name": str(i)})
+
+        records = load_table_data("r")
+        for record in records:
+            record["name"] = "x"
+        save_table_data("r", records)
+
+        self.assertEqual({r["name"] for r in load_table_data("r")}, {"x"})
+        self.assertEqual(list_partitions("r", load_layout("r")), [0, 1])
+
+    def test_delete_last_row_of_range_partition(self):
+        create_table_storage("r", RANGE_SPEC)
+        for i in range(3):
+            append_record("r", {"name": str(i)})
+
+        records = load_table_data("r", {"ID": 3})
+        save_table_data("r", [r for r in records if r["ID"] != 3], {"ID": 3})
+
+        self.assertFalse(os.path.exists(get_partition_file_path("r", 1)))
+        self.assertEqual(list_partitions("r", load_layout("r")), [0])
+        self.assertEqual(append_record("r", {"name": "new"}), 4)
+
+    @unittest.skipIf(fcntl is None, "нет файловых блокировок")
+    def test_concurrent_processes_do_not_lose_inserts(self):
+        create_table_storage("h", HASH_SPEC)
+        create_table_storage("plain")
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=_insert_many, args=(table_name, 30))
+            for table_name in ("h", "h", "plain", "plain")
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        for table_name in ("h", "plain"):
+            ids = [r["ID"] for r in load_table_data(table_name)]
+            self.assertEqual(len(ids), 60)
+            self.assertEqual(len(set(ids)), 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Проверка типов столбцов: null, даты и компактное кодирование."""
+import unittest
+
+from src.primitive_db.parser import (
+    get_raw_clause,
+    parse_insert_values,
+    parse_where_condition,
+)
+from src.primitive_db.schema import (
+    coerce_clause,
+    compile_schema,
+    decode_rows,
+    encode_rows,
+    get_block_columns,
+)
+
+SCHEMA = compile_schema(("ID:int", "name:str", "note:str?", "age:int?"))
+
+
+class NullLiteralTest(unittest.TestCase):
+    def test_insert_null_only_for_nullable_columns(self):
+        values = parse_insert_values('(null, "null", null)', SCHEMA[1:])
+        self.assertEqual(values, ["null", "null", None])
+
+    def test_non_nullable_int_rejects_null(self):
+        schema = compile_schema(("ID:int", "age:int"))
+        with self.assertRaises(ValueError):
+            parse_insert_values("(null)", schema[1:])
+
+    def test_quoted_null_in_where_is_string(self):
+        clause = parse_where_condition('note = "null"')
+        self.assertEqual(coerce_clause(SCHEMA, clause), {"note": "null"})
+
+    def test_unquoted_null_in_where(self):
+        self.assertEqual(
+            coerce_clause(SCHEMA, parse_where_condition("note = null")),
+            {"note": None},
+        )
+        self.assertEqual(
+            coerce_clause(SCHEMA, parse_where_condition("name = null")),
+            {"name": "null"},
+        )
+
+    def test_raw_clause_keeps_quotes(self):
+        command = 'update users set note = "null" where age = 5'
+        self.assertEqual(get_raw_clause(command, "set", "where"), 'note = "null"')
+        self.assertEqual(get_raw_clause(command, "where"), "age = 5")
+
+
+class DateTest(unittest.TestCase):
+    schema = compile_schema(("ID:int", "day:date"))
+
+    def test_non_canonical_date_is_normalized(self):
+        for raw in ('"20240102"', "20240102", '"2024-01-02"'):
+            clause = parse_where_condition(f"day = {raw}")
+            self.assertEqual(
+                coerce_clause(self.schema, clause), {"day": "2024-01-02"}, raw
+            )
+
+    def test_insert_normalizes_date(self):
+        values = parse_insert_values('("20240102")', self.schema[1:])
+        self.assertEqual(values, ["2024-01-02"])
+
+
+class BlockEncodingTest(unittest.TestCase):
+    schema = compile_schema(("ID:int", "day:date?", "ok:bool", "name:str"))
+
+    def test_round_trip(self):
+        records = [
+            {"ID": 1, "day": "2024-01-02", "ok": True, "name": "a"},
+            {"ID": 2, "day": None, "ok": False, "name": "2024-01-02"},
+        ]
+        columns = get_block_columns(self.schema)
+        rows = encode_rows(columns, records)
+
+        self.assertEqual(rows[0], [1, 738887, 1, "a"])
+        self.assertEqual(decode_rows(columns, rows), records)
+
+    def test_records_outside_schema_are_not_encoded(self):
+        columns = get_block_columns(self.schema)
+        extra = {"ID": 1, "day": None, "ok": True, "name": "a", "x": 1}
+        wrong_type = {"ID": 1, "day": "20240102", "ok": True, "name": "a"}
+        self.assertIsNone(encode_rows(columns, [extra]))
+        self.assertIsNone(encode_rows(columns, [wrong_type]))
+
+
+if __name__ == '__main__':
+    unittest.main()
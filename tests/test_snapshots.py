@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Проверка снимков для чтения и кэша результатов select."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.primitive_db import snapshots
+from src.primitive_db.blocks import save_records
+from src.primitive_db.decorators import create_cacher
+
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        self.files = ["a.json", "b.json"]
+        for filepath in self.files:
+            save_records(filepath, [{"ID": 1}])
+
+    def tearDown(self):
+        snapshots.forget_snapshots(self.files)
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_stale_snapshot_is_dropped_after_last_reader(self):
+        with snapshots.read_snapshot(self.files[:1]):
+            save_records(self.files[0], [{"ID": 1}, {"ID": 2}])
+        self.assertEqual(snapshots.get_snapshot_stats()["current"], 0)
+
+    def test_live_snapshot_is_kept_within_limit(self):
+        with snapshots.read_snapshot(self.files):
+            pass
+        self.assertEqual(snapshots.get_snapshot_stats()["current"], 2)
+
+        with mock.patch.object(snapshots, "SNAPSHOT_CACHE_RECORDS", 1):
+            with snapshots.read_snapshot(self.files):
+                pass
+        self.assertLessEqual(snapshots.get_snapshot_stats()["current"], 1)
+
+    def test_many_files_are_pinned_in_parallel(self):
+        files = [f"p{i}.json" for i in range(4)]
+        for i, filepath in enumerate(files):
+            save_records(filepath, [{"ID": i}])
+
+        with snapshots.read_snapshot(files) as (records, version):
+            self.assertEqual([r["ID"] for r in records], [0, 1, 2, 3])
+            self.assertEqual(len(version), 4)
+            self.assertEqual(snapshots.get_snapshot_stats()["current"], 4)
+        snapshots.forget_snapshots(files)
+
+    def test_failed_pin_releases_pinned_snapshots(self):
+        save_records("bad.json", [])
+        with open("bad.json", "w", encoding="utf-8") as f:
+            f.write("{")
+        files = self.files + ["bad.json"]
+
+        with self.assertRaises(ValueError):
+            with snapshots.read_snapshot(files):
+                pass
+        for filepath in self.files:
+            self.assertEqual(snapshots._current[filepath]["readers"], 0)
+
+    def test_changed_file_is_read_again(self):
+        original = snapshots._pin_files
+        calls = []
+
+        def pin_and_change(filepaths, where_clause):
+            result = original(filepaths, where_clause)
+            if not calls:
+                save_records(self.files[0], [{"ID": 1}, {"ID": 2}])
+            calls.append(result)
+            return result
+
+        with mock.patch.object(snapshots, "_pin_files", pin_and_change):
+            with snapshots.read_snapshot(self.files) as (records, version):
+                self.assertEqual(len(records), 3)
+                self.assertIsNotNone(version)
+        self.assertEqual(len(calls), 2)
+
+
+class CacherTest(unittest.TestCase):
+    def test_cache_is_bounded(self):
+        cache_result = create_cacher(max_weight=2)
+        for key in ("a", "b", "a", "c"):
+            cache_result(key, lambda: key)
+
+        calls = []
+        cache_result("a", lambda: calls.append("a"))
+        cache_result("b", lambda: calls.append("b"))
+        self.assertEqual(calls, ["b"])
+
+    def test_cache_is_bounded_by_weight(self):
+        cache_result = create_cacher(max_weight=5, weigh=len)
+        cache_result("big", lambda: [0] * 6)
+        cache_result("a", lambda: [0] * 3)
+        cache_result("b", lambda: [0] * 2)
+        cache_result("c", lambda: [0] * 2)
+
+        calls = []
+        for key in ("big", "a", "b", "c"):
+            cache_result(key, lambda key=key: calls.append(key) or [])
+        self.assertEqual(calls, ["big", "a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
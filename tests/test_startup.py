@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""Проверка времени холодного запуска (импорта движка)."""
+import unittest
+
+from src.primitive_db.constants import STARTUP_BUDGET_MS
+from src.primitive_db.profiling import collect_import_times
+
+ENGINE_MODULE = "src.primitive_db.engine"
+LAZY_MODULES = {"prettytable", "concurrent.futures", "lzma", "bz2", "hashlib"}
+
+
+class StartupBudgetTest(unittest.TestCase):
+    def test_engine_import_fits_budget(self):
+        # Берется лучший из нескольких запусков, чтобы не зависеть от шума
+        totals = [
+            collect_import_times(ENGINE_MODULE)[-1][2] / 1000 for _ in range(3)
+        ]
+        self.assertLessEqual(min(totals), STARTUP_BUDGET_MS)
+
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        imported = {name for name, _, _ in collect_import_times(ENGINE_MODULE)}
+        self.assertFalse(imported & LAZY_MODULES)
+
+    def test_failed_import_reports_error(self):
+        with self.assertRaises(RuntimeError):
+            collect_import_times("src.primitive_db.no_such_module")
+
+
+if __name__ == '__main__':
+    unittest.main()
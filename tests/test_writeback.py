@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Проверка порога и фонового потока отложенной записи."""
+import os
+import tempfile
+import time
+import unittest
+
+from src.primitive_db import writeback
+from src.primitive_db.blocks import load_records
+
+
+class WritebackThresholdTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+    def tearDown(self):
+        writeback.disable()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_changes_of_one_file_reach_threshold(self):
+        writeback.enable(interval=60, max_changes=3)
+        for count in range(1, 4):
+            writeback.save_records("t.json", [{"ID": i} for i in range(count)])
+
+        deadline = time.monotonic() + 5
+        while writeback.get_stats()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(load_records("t.json")), 3)
+        self.assertEqual(writeback.get_stats()["pending_changes"], 0)
+
+    def test_changes_below_threshold_stay_pending(self):
+        writeback.enable(interval=60, max_changes=3)
+        writeback.save_records("t.json", [{"ID": 1}])
+        writeback.save_records("t.json", [{"ID": 1}, {"ID": 2}])
+
+        self.assertFalse(os.path.exists("t.json"))
+        self.assertEqual(writeback.get_stats()["pending_changes"], 2)
+
+    def test_infinite_interval_is_rejected(self):
+        for interval in (float("inf"), float("nan"), 0):
+            with self.assertRaises(ValueError):
+                writeback.enable(interval=interval)
+        self.assertFalse(writeback.get_stats()["enabled"])
+
+    def test_wait_error_is_reported_and_thread_survives(self):
+        writeback.enable(interval=60)
+        writeback._config["interval"] = float("inf")
+        writeback._wakeup.set()
+
+        deadline = time.monotonic() + 5
+        while (not writeback.get_stats()["last_error"]
+               and time.monotonic() < deadline):
+            time.sleep(0.01)
+        self.assertIsNotNone(writeback.get_stats()["last_error"])
+        self.assertTrue(writeback._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()